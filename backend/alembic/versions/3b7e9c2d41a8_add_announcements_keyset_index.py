@@ -0,0 +1,37 @@
+"""add announcements keyset index
+
+Revision ID: 3b7e9c2d41a8
+Revises: 06ce3c23fe54
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e9c2d41a8'
+down_revision: Union[str, Sequence[str], None] = '06ce3c23fe54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A chave do cursor é (created_at, id): avisos antigos sem data recebem a atual e a coluna passa a ser obrigatória
+    op.execute("UPDATE announcements SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column('announcements', 'created_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index(
+        'ix_announcements_archived_created_id',
+        'announcements',
+        ['is_archived', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_announcements_archived_created_id', table_name='announcements')
+    op.alter_column('announcements', 'created_at', existing_type=sa.DateTime(), nullable=True)
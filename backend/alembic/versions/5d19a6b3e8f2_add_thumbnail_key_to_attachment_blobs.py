@@ -0,0 +1,28 @@
+"""add thumbnail_key to attachment blobs
+
+Revision ID: 5d19a6b3e8f2
+Revises: c82d5e1f9a07
+Create Date: 2026-10-18 16:41:52.117630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d19a6b3e8f2'
+down_revision: Union[str, Sequence[str], None] = 'c82d5e1f9a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('attachment_blobs', sa.Column('thumbnail_key', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('attachment_blobs', 'thumbnail_key')
@@ -0,0 +1,161 @@
+"""partition acks and audience by announcement month
+
+Revision ID: 7b2e4f9c1a3d
+Revises: f3c8a1d6b952
+Create Date: 2026-10-18 20:26:41.915370
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4f9c1a3d'
+down_revision: Union[str, Sequence[str], None] = 'f3c8a1d6b952'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(d: date, months: int) -> date:
+    total = d.year * 12 + d.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _create_partitions(table: str) -> None:
+    """Partição DEFAULT + uma por mês, do aviso mais antigo até alguns meses à frente."""
+    oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM announcements")).scalar()
+    today = datetime.utcnow()
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), PARTITIONS_AHEAD)
+
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('announcements', sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    op.rename_table('announcement_acknowledgments', 'announcement_acknowledgments_old')
+    op.execute("ALTER INDEX announcement_acknowledgments_pkey RENAME TO announcement_acknowledgments_old_pkey")
+    op.execute("ALTER INDEX ix_announcement_acknowledgments_ann_at RENAME TO ix_announcement_acknowledgments_old_ann_at")
+    op.rename_table('announcement_audience', 'announcement_audience_old')
+    op.execute("ALTER INDEX announcement_audience_pkey RENAME TO announcement_audience_old_pkey")
+    op.execute("ALTER INDEX ix_announcement_audience_user_ann RENAME TO ix_announcement_audience_old_user_ann")
+
+    op.create_table(
+        'announcement_acknowledgments',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('announcement_id', sa.UUID(), nullable=False),
+        sa.Column('announcement_created_at', sa.DateTime(), nullable=False),
+        sa.Column('acknowledged_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['announcement_id'], ['announcements.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'announcement_id', 'announcement_created_at'),
+        postgresql_partition_by='RANGE (announcement_created_at)',
+    )
+    op.create_index(
+        'ix_announcement_acknowledgments_ann_at',
+        'announcement_acknowledgments',
+        ['announcement_id', 'acknowledged_at'],
+        unique=False,
+    )
+    op.create_table(
+        'announcement_audience',
+        sa.Column('announcement_id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('announcement_created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['announcement_id'], ['announcements.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('announcement_id', 'user_id', 'announcement_created_at'),
+        postgresql_partition_by='RANGE (announcement_created_at)',
+    )
+    op.create_index(
+        'ix_announcement_audience_user_ann',
+        'announcement_audience',
+        ['user_id', 'announcement_id'],
+        unique=False,
+    )
+    _create_partitions('announcement_acknowledgments')
+    _create_partitions('announcement_audience')
+
+    op.execute(
+        """
+        INSERT INTO announcement_acknowledgments (user_id, announcement_id, announcement_created_at, acknowledged_at)
+        SELECT o.user_id, o.announcement_id, a.created_at, o.acknowledged_at
+          FROM announcement_acknowledgments_old o
+          JOIN announcements a ON a.id = o.announcement_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO announcement_audience (announcement_id, user_id, announcement_created_at)
+        SELECT o.announcement_id, o.user_id, a.created_at
+          FROM announcement_audience_old o
+          JOIN announcements a ON a.id = o.announcement_id
+        """
+    )
+    op.drop_table('announcement_acknowledgments_old')
+    op.drop_table('announcement_audience_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('announcement_acknowledgments', 'announcement_acknowledgments_part')
+    op.execute("ALTER INDEX announcement_acknowledgments_pkey RENAME TO announcement_acknowledgments_part_pkey")
+    op.execute("ALTER INDEX ix_announcement_acknowledgments_ann_at RENAME TO ix_announcement_acknowledgments_part_ann_at")
+    op.rename_table('announcement_audience', 'announcement_audience_part')
+    op.execute("ALTER INDEX announcement_audience_pkey RENAME TO announcement_audience_part_pkey")
+    op.execute("ALTER INDEX ix_announcement_audience_user_ann RENAME TO ix_announcement_audience_part_user_ann")
+
+    op.create_table(
+        'announcement_acknowledgments',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('announcement_id', sa.UUID(), nullable=False),
+        sa.Column('acknowledged_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['announcement_id'], ['announcements.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'announcement_id'),
+    )
+    op.create_index(
+        'ix_announcement_acknowledgments_ann_at',
+        'announcement_acknowledgments',
+        ['announcement_id', 'acknowledged_at'],
+        unique=False,
+    )
+    op.create_table(
+        'announcement_audience',
+        sa.Column('announcement_id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.ForeignKeyConstraint(['announcement_id'], ['announcements.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('announcement_id', 'user_id'),
+    )
+    op.create_index(
+        'ix_announcement_audience_user_ann',
+        'announcement_audience',
+        ['user_id', 'announcement_id'],
+        unique=False,
+    )
+    op.execute(
+        "INSERT INTO announcement_acknowledgments (user_id, announcement_id, acknowledged_at) "
+        "SELECT user_id, announcement_id, acknowledged_at FROM announcement_acknowledgments_part"
+    )
+    op.execute(
+        "INSERT INTO announcement_audience (announcement_id, user_id) "
+        "SELECT announcement_id, user_id FROM announcement_audience_part"
+    )
+    # Apagar a tabela particionada apaga junto as partições anexadas (as do schema frio ficam)
+    op.drop_table('announcement_acknowledgments_part')
+    op.drop_table('announcement_audience_part')
+    op.drop_column('announcements', 'expires_at')
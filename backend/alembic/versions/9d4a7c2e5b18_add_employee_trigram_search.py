@@ -0,0 +1,51 @@
+"""add employee trigram search
+
+Revision ID: 9d4a7c2e5b18
+Revises: 7b2e4f9c1a3d
+Create Date: 2026-10-18 21:40:12.318807
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a7c2e5b18'
+down_revision: Union[str, Sequence[str], None] = '7b2e4f9c1a3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() é STABLE (depende do dicionário configurado) e não pode entrar em índices;
+    # o wrapper fixa o dicionário e pode ser declarado IMMUTABLE
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        """
+    )
+    op.execute(
+        "CREATE INDEX ix_employees_full_name_trgm ON employees "
+        "USING gin (immutable_unaccent(full_name) gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_users_username_trgm ON users "
+        "USING gin (immutable_unaccent(username) gin_trgm_ops)"
+    )
+    # Ordem padrão do diretório (keyset por nome, id)
+    op.create_index('ix_employees_full_name_id', 'employees', ['full_name', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_employees_full_name_id', table_name='employees')
+    op.drop_index('ix_users_username_trgm', table_name='users')
+    op.drop_index('ix_employees_full_name_trgm', table_name='employees')
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
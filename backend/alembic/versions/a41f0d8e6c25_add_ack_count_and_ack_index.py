@@ -0,0 +1,47 @@
+"""add ack_count and ack index
+
+Revision ID: a41f0d8e6c25
+Revises: 3b7e9c2d41a8
+Create Date: 2026-10-18 10:03:17.552910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f0d8e6c25'
+down_revision: Union[str, Sequence[str], None] = '3b7e9c2d41a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('announcements', sa.Column('ack_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_index(
+        'ix_announcement_acknowledgments_ann_at',
+        'announcement_acknowledgments',
+        ['announcement_id', 'acknowledged_at'],
+        unique=False,
+    )
+
+    # Backfill do contador com as ciências já registradas
+    op.execute(
+        """
+        UPDATE announcements a
+           SET ack_count = s.total
+          FROM (SELECT announcement_id, COUNT(*) AS total
+                  FROM announcement_acknowledgments
+                 GROUP BY announcement_id) s
+         WHERE s.announcement_id = a.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_announcement_acknowledgments_ann_at', table_name='announcement_acknowledgments')
+    op.drop_column('announcements', 'ack_count')
@@ -0,0 +1,35 @@
+"""add directory sync state
+
+Revision ID: b6e1d3f8a245
+Revises: 9d4a7c2e5b18
+Create Date: 2026-10-18 21:12:40.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1d3f8a245'
+down_revision: Union[str, Sequence[str], None] = '9d4a7c2e5b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('directory_sync_state',
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('usn', sa.BigInteger(), nullable=True),
+        sa.Column('dc', sa.String(), nullable=True),
+        sa.Column('last_sync_at', sa.DateTime(), nullable=True),
+        sa.Column('last_full_sync_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('source')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('directory_sync_state')
@@ -0,0 +1,48 @@
+"""add attachment blobs
+
+Revision ID: c82d5e1f9a07
+Revises: a41f0d8e6c25
+Create Date: 2026-10-18 14:27:05.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c82d5e1f9a07'
+down_revision: Union[str, Sequence[str], None] = 'a41f0d8e6c25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'attachment_blobs',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_referenced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_attachment_blobs_sha256'), 'attachment_blobs', ['sha256'], unique=False)
+    op.add_column('announcements', sa.Column('attachment_key', sa.String(), nullable=True))
+    op.create_index(op.f('ix_announcements_attachment_key'), 'announcements', ['attachment_key'], unique=False)
+    op.create_foreign_key(
+        'announcements_attachment_key_fkey', 'announcements', 'attachment_blobs',
+        ['attachment_key'], ['key']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('announcements_attachment_key_fkey', 'announcements', type_='foreignkey')
+    op.drop_index(op.f('ix_announcements_attachment_key'), table_name='announcements')
+    op.drop_column('announcements', 'attachment_key')
+    op.drop_index(op.f('ix_attachment_blobs_sha256'), table_name='attachment_blobs')
+    op.drop_table('attachment_blobs')
@@ -0,0 +1,50 @@
+"""add directory sync jobs
+
+Revision ID: d4f7a2c9e813
+Revises: b6e1d3f8a245
+Create Date: 2026-10-18 22:05:17.604119
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7a2c9e813'
+down_revision: Union[str, Sequence[str], None] = 'b6e1d3f8a245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('directory_sync_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('full', sa.Boolean(), nullable=False),
+        sa.Column('trigger', sa.String(), nullable=False),
+        sa.Column('requested_by', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('processed', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('stats', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['requested_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_directory_sync_jobs_created_at'), 'directory_sync_jobs', ['created_at'], unique=False)
+    # No máximo uma sincronização na fila/rodando por origem
+    op.create_index('uq_directory_sync_jobs_active', 'directory_sync_jobs', ['source'], unique=True,
+                    postgresql_where=sa.text("status IN ('queued', 'running')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_directory_sync_jobs_active', table_name='directory_sync_jobs')
+    op.drop_index(op.f('ix_directory_sync_jobs_created_at'), table_name='directory_sync_jobs')
+    op.drop_table('directory_sync_jobs')
@@ -0,0 +1,46 @@
+"""add announcements search vector
+
+Revision ID: e6a0b4c7d2f9
+Revises: 5d19a6b3e8f2
+Create Date: 2026-10-18 18:05:33.480126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a0b4c7d2f9'
+down_revision: Union[str, Sequence[str], None] = '5d19a6b3e8f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('announcements', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('portuguese', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('portuguese', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index(
+        'ix_announcements_search_vector',
+        'announcements',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_announcements_search_vector', table_name='announcements', postgresql_using='gin')
+    op.drop_column('announcements', 'search_vector')
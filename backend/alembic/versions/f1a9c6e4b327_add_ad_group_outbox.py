@@ -0,0 +1,40 @@
+"""add ad group outbox
+
+Revision ID: f1a9c6e4b327
+Revises: d4f7a2c9e813
+Create Date: 2026-10-18 23:02:48.951362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a9c6e4b327'
+down_revision: Union[str, Sequence[str], None] = 'd4f7a2c9e813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ad_group_outbox',
+        sa.Column('username', sa.String(), nullable=False),
+        sa.Column('depts', sa.JSON(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('username')
+    )
+    op.create_index(op.f('ix_ad_group_outbox_next_attempt_at'), 'ad_group_outbox', ['next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ad_group_outbox_next_attempt_at'), table_name='ad_group_outbox')
+    op.drop_table('ad_group_outbox')
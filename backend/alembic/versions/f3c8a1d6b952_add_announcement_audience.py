@@ -0,0 +1,57 @@
+"""add announcement audience
+
+Revision ID: f3c8a1d6b952
+Revises: e6a0b4c7d2f9
+Create Date: 2026-10-18 19:12:08.204511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a1d6b952'
+down_revision: Union[str, Sequence[str], None] = 'e6a0b4c7d2f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'announcement_audience',
+        sa.Column('announcement_id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.ForeignKeyConstraint(['announcement_id'], ['announcements.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('announcement_id', 'user_id'),
+    )
+    op.create_index(
+        'ix_announcement_audience_user_ann',
+        'announcement_audience',
+        ['user_id', 'announcement_id'],
+        unique=False,
+    )
+
+    # Backfill com a mesma regra de services/audience.py
+    op.execute(
+        """
+        INSERT INTO announcement_audience (announcement_id, user_id)
+        SELECT a.id, u.id
+          FROM announcements a
+          JOIN users u ON u.is_active
+          LEFT JOIN employees e ON e.user_id = u.id
+         WHERE a.category IN ('GENERAL', 'TECH')
+            OR (a.category = 'OPS_MGMT' AND u.role IN ('admin', 'diretoria', 'coordenador', 'supervisor'))
+            OR (a.category = 'SECTOR' AND (e.department = a.target_dept
+                                           OR (e.meta::jsonb -> 'depts') ? a.target_dept))
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_announcement_audience_user_ann', table_name='announcement_audience')
+    op.drop_table('announcement_audience')
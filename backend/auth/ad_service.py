@@ -1,7 +1,12 @@
 import os
 import re
-from ldap3 import Server, Connection, ALL, MODIFY_ADD, MODIFY_DELETE
-from typing import Optional, List, Dict
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from ldap3 import Server, Connection, DSA, MODIFY_ADD, MODIFY_DELETE
+from ldap3.utils.conv import escape_filter_chars
+from typing import Optional, List, Dict, Set, Iterator
+from auth.ldap_pool import LDAPConnectionPool
 
 AD_SERVER = os.getenv("AD_SERVER", "ldap://192.168.0.31")
 AD_DOMAIN = os.getenv("AD_DOMAIN", "mdr.local")
@@ -13,6 +18,68 @@ AD_BIND_PASSWORD = os.getenv("AD_BIND_PASSWORD")
 # MDR -> 98_Grupos -> Seguranca
 GROUPS_OU = f"OU=Seguranca,OU=98_Grupos,OU=MDR,{AD_BASE_DN}"
 
+# Contas de usuário "de verdade" (exclui computadores, contatos e contas de serviço gerenciadas)
+USER_FILTER = "(&(objectCategory=person)(objectClass=user)(sAMAccountType=805306368))"
+USER_ATTRIBUTES = ['sAMAccountName', 'displayName', 'mail', 'department', 'title', 'userAccountControl', 'memberOf']
+# Quantos logins por filtro OR ao reler usuários específicos
+LOOKUP_CHUNK_SIZE = 100
+# Entradas por página nas buscas paginadas (o MaxPageSize padrão do AD é 1000)
+AD_PAGE_SIZE = int(os.getenv("AD_PAGE_SIZE", "500"))
+PAGED_RESULTS_OID = "1.2.840.113556.1.4.319"
+
+# Pool de conexões da conta de serviço
+AD_POOL_SIZE = int(os.getenv("AD_POOL_SIZE", "4"))
+AD_POOL_IDLE_SECONDS = int(os.getenv("AD_POOL_IDLE_SECONDS", "300"))
+AD_POOL_HEALTHCHECK_SECONDS = int(os.getenv("AD_POOL_HEALTHCHECK_SECONDS", "60"))
+AD_POOL_TIMEOUT = int(os.getenv("AD_POOL_TIMEOUT", "10"))
+AD_CONNECT_TIMEOUT = int(os.getenv("AD_CONNECT_TIMEOUT", "5"))
+
+# Chamadas ao AD feitas pelas rotas async: no máximo AD_MAX_CONCURRENCY ao mesmo tempo por worker
+# e cada uma (fila + execução) limitada a AD_CALL_TIMEOUT segundos
+AD_MAX_CONCURRENCY = int(os.getenv("AD_MAX_CONCURRENCY", "8"))
+AD_CALL_TIMEOUT = float(os.getenv("AD_CALL_TIMEOUT", "10"))
+
+# Um Server por processo e só o rootDSE (DSA): o schema completo (ALL) custava uma leitura enorme a cada conexão
+_server = Server(AD_SERVER, get_info=DSA, connect_timeout=AD_CONNECT_TIMEOUT)
+
+def _service_connection() -> Connection:
+    # auto_bind=True já faz o login; receive_timeout evita thread presa num DC que parou de responder
+    return Connection(_server, user=AD_BIND_USER, password=AD_BIND_PASSWORD, auto_bind=True,
+                      receive_timeout=AD_CALL_TIMEOUT)
+
+_pool = LDAPConnectionPool(
+    _service_connection, size=AD_POOL_SIZE, idle_seconds=AD_POOL_IDLE_SECONDS,
+    healthcheck_seconds=AD_POOL_HEALTHCHECK_SECONDS, timeout=AD_POOL_TIMEOUT,
+)
+
+_executor = ThreadPoolExecutor(max_workers=AD_MAX_CONCURRENCY, thread_name_prefix="ad")
+
+class ADTimeoutError(Exception):
+    """O AD não respondeu dentro de AD_CALL_TIMEOUT."""
+
+class ADOperationError(Exception):
+    """O AD recusou uma gravação (sem permissão, violação de restrição...)."""
+
+# Códigos LDAP que significam "já está assim" (retentativa depois de uma gravação parcial)
+NO_SUCH_ATTRIBUTE, ATTRIBUTE_OR_VALUE_EXISTS, ENTRY_ALREADY_EXISTS = 16, 20, 68
+
+def _check_result(conn, action: str, already_done=()) -> None:
+    # Conexões com raise_exceptions=False: add/modify recusados só aparecem em conn.result
+    if conn.result.get("result") not in (0, *already_done):
+        raise ADOperationError(f"{action}: {conn.result.get('description')} {conn.result.get('message') or ''}".strip())
+
+async def call_ad(fn, *args, timeout: float = AD_CALL_TIMEOUT):
+    """
+    Executa uma operação bloqueante do ADService fora do event loop, no executor dedicado ao AD.
+    Um DC lento só atrasa as requisições que dependem dele; as demais rotas do worker seguem respondendo.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(_executor, functools.partial(fn, *args)), timeout)
+    except asyncio.TimeoutError:
+        # Se ainda estava na fila, a chamada é cancelada; se já rodava, termina pelo receive_timeout da conexão
+        raise ADTimeoutError(f"O AD não respondeu em {timeout:g}s.")
+
 class ADService:
     @staticmethod
     def _normalize_dept(name: str) -> str:
@@ -23,13 +90,15 @@ class ADService:
 
     @staticmethod
     def _get_conn():
-        server = Server(AD_SERVER, get_info=ALL)
-        # auto_bind=True já faz o login
-        return Connection(server, user=AD_BIND_USER, password=AD_BIND_PASSWORD, auto_bind=True)
+        """Empresta uma conexão da conta de serviço do pool (use com `with`; ela volta ao pool no fim)."""
+        return _pool.connection()
 
     @staticmethod
-    def ensure_group_exists(dept_name: str):
-        """Busca o grupo no AD. Se não existir, cria na OU de segurança."""
+    def ensure_group_exists(dept_name: str, conn=None, raise_errors: bool = False):
+        """
+        Busca o grupo no AD. Se não existir, cria na OU de segurança. Reusa `conn` se informada.
+        Retorna None para GERAL (sem grupo) e, sem `raise_errors`, também quando o AD falha.
+        """
         dept_name = ADService._normalize_dept(dept_name)
         if dept_name == "GERAL": return None
 
@@ -37,110 +106,171 @@ class ADService:
         group_dn = f"CN={group_cn},{GROUPS_OU}"
         
         try:
-            with ADService._get_conn() as conn:
-                conn.search(AD_BASE_DN, f"(&(objectClass=group)(cn={group_cn}))", attributes=['distinguishedName'])
-                if conn.entries:
-                    return conn.entries[0].distinguishedName.value
-                
-                # Tenta criar se não existir
-                success = conn.add(group_dn, attributes={
-                    'objectClass': ['top', 'group'],
-                    'sAMAccountName': group_cn,
-                    'description': f'Setor ZeroCore: {dept_name}'
-                })
-                
-                if success:
-                    print(f"✅ Grupo {group_cn} criado com sucesso em {GROUPS_OU}")
-                    return group_dn
-                else:
-                    print(f"❌ Falha ao criar grupo {group_cn}: {conn.result.get('description')}")
-                    return None
+            if conn is None:
+                with ADService._get_conn() as own:
+                    return ADService.ensure_group_exists(dept_name, own, raise_errors)
+
+            conn.search(AD_BASE_DN, f"(&(objectClass=group)(cn={group_cn}))", attributes=['distinguishedName'])
+            if conn.entries:
+                return conn.entries[0].entry_dn
+
+            # Tenta criar se não existir
+            conn.add(group_dn, attributes={
+                'objectClass': ['top', 'group'],
+                'sAMAccountName': group_cn,
+                'description': f'Setor ZeroCore: {dept_name}'
+            })
+            _check_result(conn, f"Falha ao criar grupo {group_cn}")
+            print(f"✅ Grupo {group_cn} criado com sucesso em {GROUPS_OU}")
+            return group_dn
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"💥 Erro fatal ao gerenciar grupo no AD: {e}")
             return None
 
     @staticmethod
-    def set_user_groups(username: str, depts: List[str]) -> bool:
-        """Vincula o usuário aos grupos ZC_DEPT no AD. Retorna True se sucesso, False se falha."""
-        try:
-            with ADService._get_conn() as conn:
-                # 1. Busca DN real do usuário
-                conn.search(AD_BASE_DN, f"(&(objectClass=user)(sAMAccountName={username}))", attributes=['distinguishedName', 'memberOf'])
-                if not conn.entries: 
-                    print(f"👤 Usuário {username} não encontrado no AD.")
-                    return False
-                
-                user_entry = conn.entries[0]
-                user_dn = user_entry.distinguishedName.value
-                # Pega apenas os nomes dos grupos (CN)
-                current_groups_dn = [str(g) for g in user_entry.memberOf] if 'memberOf' in user_entry else []
-                current_groups_cn = [dn.split(',')[0].split('=')[1].upper() for dn in current_groups_dn]
-                
-                # 2. Prepara lista de grupos alvo (apenas os que não são GERAL)
-                target_depts = [ADService._normalize_dept(d) for d in depts if ADService._normalize_dept(d) != "GERAL"]
-                target_groups_cn = [f"ZC_DEPT_{d.replace(' ', '_')}" for d in target_depts]
-                
-                # 3. Remover de grupos ZC que não estão mais na lista
-                for g_dn in current_groups_dn:
-                    g_cn = g_dn.split(',')[0].split('=')[1].upper()
-                    if g_cn.startswith("ZC_DEPT_") and g_cn not in target_groups_cn:
-                        conn.modify(g_dn, {'member': [(MODIFY_DELETE, [user_dn])]})
-                        print(f"➖ Removido do grupo: {g_cn}")
-
-                # 4. Adicionar aos grupos novos
-                for dept in target_depts:
-                    g_cn = f"ZC_DEPT_{dept.replace(' ', '_')}"
-                    if g_cn not in current_groups_cn:
-                        g_dn = ADService.ensure_group_exists(dept)
-                        if g_dn:
-                            conn.modify(g_dn, {'member': [(MODIFY_ADD, [user_dn])]})
-                            print(f"➕ Adicionado ao grupo: {g_cn}")
+    def set_user_groups(username: str, depts: List[str]) -> None:
+        """
+        Vincula o usuário aos grupos ZC_DEPT no AD (remove dos que saíram da lista).
+        Levanta exceção se o AD falhar, recusar alguma gravação ou o usuário não existir:
+        quem chama (worker do outbox) decide se tenta de novo.
+        """
+        with ADService._get_conn() as conn:
+            # 1. Busca DN real do usuário
+            conn.search(AD_BASE_DN, f"(&(objectClass=user)(sAMAccountName={escape_filter_chars(username)}))", attributes=['distinguishedName', 'memberOf'])
+            if not conn.entries:
+                raise LookupError(f"Usuário {username} não encontrado no AD.")
             
-            return True # Sincronização com o AD concluída com sucesso
-                            
-        except Exception as e:
-            print(f"❌ Erro na sincronização de grupos: {e}")
-            return False # Retorna False para avisar a rota que o AD está offline ou deu erro
+            user_entry = conn.entries[0]
+            user_dn = user_entry.distinguishedName.value
+            # Pega apenas os nomes dos grupos (CN)
+            current_groups_dn = [str(g) for g in user_entry.memberOf] if 'memberOf' in user_entry else []
+            current_groups_cn = [dn.split(',')[0].split('=')[1].upper() for dn in current_groups_dn]
+            
+            # 2. Prepara lista de grupos alvo (apenas os que não são GERAL)
+            target_depts = [ADService._normalize_dept(d) for d in depts if ADService._normalize_dept(d) != "GERAL"]
+            target_groups_cn = [f"ZC_DEPT_{d.replace(' ', '_')}" for d in target_depts]
+            
+            # 3. Remover de grupos ZC que não estão mais na lista
+            for g_dn in current_groups_dn:
+                g_cn = g_dn.split(',')[0].split('=')[1].upper()
+                if g_cn.startswith("ZC_DEPT_") and g_cn not in target_groups_cn:
+                    conn.modify(g_dn, {'member': [(MODIFY_DELETE, [user_dn])]})
+                    _check_result(conn, f"Falha ao remover {username} do grupo {g_cn}", already_done=(NO_SUCH_ATTRIBUTE,))
+                    print(f"➖ Removido do grupo: {g_cn}")
+
+            # 4. Adicionar aos grupos novos
+            for dept in target_depts:
+                g_cn = f"ZC_DEPT_{dept.replace(' ', '_')}"
+                if g_cn not in current_groups_cn:
+                    # Mesma conexão, sem abrir outra por setor; grupo que não pôde ser criado é erro, não é pulado
+                    g_dn = ADService.ensure_group_exists(dept, conn, raise_errors=True)
+                    conn.modify(g_dn, {'member': [(MODIFY_ADD, [user_dn])]})
+                    _check_result(conn, f"Falha ao adicionar {username} ao grupo {g_cn}",
+                                  already_done=(ATTRIBUTE_OR_VALUE_EXISTS, ENTRY_ALREADY_EXISTS))
+                    print(f"➕ Adicionado ao grupo: {g_cn}")
+
+    @staticmethod
+    def _user_from_entry(e) -> Dict:
+        uac = int(e.userAccountControl.value) if e.userAccountControl else 512
+        groups = [str(g).split(',')[0].split('=')[1].upper() for g in e.memberOf] if 'memberOf' in e else []
+        
+        # Filtra apenas grupos ZC_DEPT_ e limpa o nome
+        zc_depts = [ADService._normalize_dept(g) for g in groups if g.startswith("ZC_DEPT_")]
+        
+        # Define o principal
+        attr_dept = ADService._normalize_dept(str(e.department)) if e.department else None
+        primary = attr_dept if attr_dept and attr_dept != "GERAL" else (zc_depts[0] if zc_depts else "GERAL")
+
+        return {
+            "username": str(e.sAMAccountName).lower(),
+            "full_name": str(e.displayName) if e.displayName else str(e.sAMAccountName),
+            "email": str(e.mail) if e.mail else None,
+            "depts": list(set(zc_depts + [primary])),
+            "primary_dept": primary,
+            "title": str(e.title).upper() if e.title else "COLABORADOR",
+            "is_active": not (uac & 2)
+        }
+
+    @staticmethod
+    def sync_marker(conn) -> Dict:
+        """highestCommittedUSN e identificação do DC (rootDSE). USNs só valem no DC que os emitiu."""
+        # O Server é compartilhado e guarda o rootDSE do primeiro bind: relê para ter o USN atual
+        conn.refresh_server_info()
+        other = conn.server.info.other if conn.server.info else {}
+        usn = other.get("highestCommittedUSN")
+        dc = other.get("dsServiceName")
+        return {"usn": int(usn[0]) if usn else None, "dc": str(dc[0]) if dc else None}
+
+    @staticmethod
+    def _paged_search(conn, search_filter: str, attributes: List[str], page_size: int) -> Iterator:
+        """Simple Paged Results: uma página por vez (sem paginação o AD corta a busca em 1000 entradas)."""
+        cookie = None
+        while True:
+            conn.search(AD_BASE_DN, search_filter, attributes=attributes, paged_size=page_size, paged_cookie=cookie)
+            # Guarda página e cookie antes de devolver o controle: quem consome pode usar a conexão entre páginas
+            entries = conn.entries
+            cookie = conn.result.get('controls', {}).get(PAGED_RESULTS_OID, {}).get('value', {}).get('cookie')
+            yield from entries
+            if not cookie:
+                return
+
+    @staticmethod
+    def iter_users(page_size: int = AD_PAGE_SIZE, search_filter: str = USER_FILTER, conn=None) -> Iterator[Dict]:
+        """
+        Usuários do AD página a página: a memória fica limitada a uma página, não ao diretório.
+        Sem `conn`, abre a própria conexão. Erros de LDAP sobem para quem consome (resultado parcial não é silencioso).
+        """
+        if conn is None:
+            with ADService._get_conn() as own:
+                yield from ADService.iter_users(page_size, search_filter, own)
+            return
+        for e in ADService._paged_search(conn, search_filter, USER_ATTRIBUTES, page_size):
+            yield ADService._user_from_entry(e)
 
     @staticmethod
     def list_all_users() -> List[Dict]:
         try:
-            with ADService._get_conn() as conn:
-                search_filter = "(&(objectCategory=person)(objectClass=user)(sAMAccountType=805306368))"
-                conn.search(AD_BASE_DN, search_filter, attributes=['sAMAccountName', 'displayName', 'mail', 'department', 'title', 'userAccountControl', 'memberOf'])
-                
-                users = []
-                for e in conn.entries:
-                    uac = int(e.userAccountControl.value) if e.userAccountControl else 512
-                    groups = [str(g).split(',')[0].split('=')[1].upper() for g in e.memberOf] if 'memberOf' in e else []
-                    
-                    # Filtra apenas grupos ZC_DEPT_ e limpa o nome
-                    zc_depts = [ADService._normalize_dept(g) for g in groups if g.startswith("ZC_DEPT_")]
-                    
-                    # Define o principal
-                    attr_dept = ADService._normalize_dept(str(e.department)) if e.department else None
-                    primary = attr_dept if attr_dept and attr_dept != "GERAL" else (zc_depts[0] if zc_depts else "GERAL")
-
-                    users.append({
-                        "username": str(e.sAMAccountName).lower(),
-                        "full_name": str(e.displayName) if e.displayName else str(e.sAMAccountName),
-                        "email": str(e.mail) if e.mail else None,
-                        "depts": list(set(zc_depts + [primary])),
-                        "primary_dept": primary,
-                        "title": str(e.title).upper() if e.title else "COLABORADOR",
-                        "is_active": not (uac & 2)
-                    })
-                return users
+            return list(ADService.iter_users())
         except Exception as e:
             print(f"Erro list_all: {e}")
             return []
 
+    @staticmethod
+    def changed_groups(conn, since_usn: int, page_size: int = AD_PAGE_SIZE) -> Dict[str, str]:
+        """Grupos ZC_DEPT_ com uSNChanged acima da marca ({dn: setor}). Entrar/sair de grupo não muda o USN do usuário."""
+        search_filter = f"(&(objectClass=group)(cn=ZC_DEPT_*)(uSNChanged>={since_usn + 1}))"
+        return {e.entry_dn: ADService._normalize_dept(str(e.cn))
+                for e in ADService._paged_search(conn, search_filter, ['cn'], page_size)}
+
+    @staticmethod
+    def iter_changed_users(conn, since_usn: int, group_dns: List[str], page_size: int = AD_PAGE_SIZE) -> Iterator[Dict]:
+        """Usuários com uSNChanged acima da marca e membros atuais dos grupos alterados (pode repetir usuários)."""
+        yield from ADService.iter_users(page_size, f"(&{USER_FILTER}(uSNChanged>={since_usn + 1}))", conn)
+        for i in range(0, len(group_dns), LOOKUP_CHUNK_SIZE):
+            members = "".join(f"(memberOf={escape_filter_chars(dn)})" for dn in group_dns[i:i + LOOKUP_CHUNK_SIZE])
+            yield from ADService.iter_users(page_size, f"(&{USER_FILTER}(|{members}))", conn)
+
+    @staticmethod
+    def iter_users_by_name(usernames: List[str], conn, page_size: int = AD_PAGE_SIZE) -> Iterator[Dict]:
+        """Relê usuários específicos (em blocos, um filtro OR por bloco)."""
+        for i in range(0, len(usernames), LOOKUP_CHUNK_SIZE):
+            names = "".join(f"(sAMAccountName={escape_filter_chars(u)})" for u in usernames[i:i + LOOKUP_CHUNK_SIZE])
+            yield from ADService.iter_users(page_size, f"(&{USER_FILTER}(|{names}))", conn)
+
+    @staticmethod
+    def list_usernames(conn, page_size: int = AD_PAGE_SIZE) -> Set[str]:
+        """Logins de todas as contas existentes (só sAMAccountName). Quem sumiu daqui foi excluído/movido no AD."""
+        return {str(e.sAMAccountName).lower()
+                for e in ADService._paged_search(conn, USER_FILTER, ['sAMAccountName'], page_size)}
+
     @staticmethod
     def authenticate(username: str, password: str) -> Optional[Dict]:
         user_dn = f"{username}@{AD_DOMAIN}"
         try:
-            server = Server(AD_SERVER, get_info=ALL)
-            with Connection(server, user=user_dn, password=password, auto_bind=True) as conn:
+            # Bind com a senha do próprio usuário: conexão avulsa (fora do pool da conta de serviço)
+            with Connection(_server, user=user_dn, password=password, auto_bind=True, receive_timeout=AD_CALL_TIMEOUT) as conn:
                 conn.search(AD_BASE_DN, f"(sAMAccountName={username})", attributes=['displayName', 'mail', 'memberOf', 'title', 'department', 'userAccountControl'])
                 if not conn.entries: return None
                 u = conn.entries[0]
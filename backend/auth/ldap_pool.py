@@ -0,0 +1,94 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Iterator, Tuple
+from ldap3 import Connection, BASE
+from ldap3.core.exceptions import LDAPException
+
+class LDAPPoolExhausted(LDAPException):
+    """Nenhuma conexão livre no pool dentro do tempo de espera."""
+
+class LDAPConnectionPool:
+    """
+    Conexões LDAP já autenticadas (bind feito), reaproveitadas entre chamadas e threads.
+    Cada conexão é usada por uma thread por vez; no máximo `size` abertas ao mesmo tempo.
+    Conexões ociosas há mais de `idle_seconds` são descartadas (o AD derruba as ociosas por conta
+    própria, MaxConnIdleTime = 15 min) e as paradas há mais de `healthcheck_seconds` são testadas
+    antes de voltar ao uso. Conexão com erro durante o uso é descartada e a próxima é aberta do zero.
+    """
+
+    def __init__(self, factory: Callable[[], Connection], size: int, idle_seconds: float,
+                 healthcheck_seconds: float, timeout: float):
+        self._factory = factory
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: Deque[Tuple[Connection, float]] = deque()  # (conexão, último uso); a mais recente no fim
+        self._lock = threading.Lock()
+        self.idle_seconds = idle_seconds
+        self.healthcheck_seconds = healthcheck_seconds
+        self.timeout = timeout
+
+    @staticmethod
+    def _discard(conn: Connection) -> None:
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _healthy(conn: Connection) -> bool:
+        # Leitura do rootDSE: a operação mais barata que passa pelo servidor
+        try:
+            return conn.search("", "(objectClass=*)", search_scope=BASE, attributes=["1.1"])
+        except Exception:
+            return False
+
+    def _checkout(self) -> Connection:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()  # LIFO: a usada mais recentemente tem mais chance de estar viva
+            idle = time.monotonic() - last_used
+            if conn.closed or idle > self.idle_seconds:
+                self._discard(conn)
+            elif idle > self.healthcheck_seconds and not self._healthy(conn):
+                self._discard(conn)
+            else:
+                return conn
+        return self._factory()
+
+    def _checkin(self, conn: Connection) -> None:
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            if not conn.closed:
+                self._idle.append((conn, now))
+            # Despejo das ociosas demais (as mais antigas ficam no começo da fila)
+            while self._idle and now - self._idle[0][1] > self.idle_seconds:
+                expired.append(self._idle.popleft()[0])
+        for old in expired:
+            self._discard(old)
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LDAPPoolExhausted("Nenhuma conexão com o AD disponível no pool.")
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                # Estado desconhecido (erro de rede, busca paginada interrompida...): não volta para o pool
+                self._discard(conn)
+                raise
+            self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def clear(self) -> None:
+        """Fecha todas as conexões ociosas."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
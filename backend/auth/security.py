@@ -49,6 +49,22 @@ def get_token_from_cookie(request: Request):
         )
     return token
 
+def get_token_payload(token: str = Depends(get_token_from_cookie)) -> dict:
+    """
+    Valida só assinatura e expiração do token, sem consultar o banco.
+    Para rotas muito frequentes e somente leitura (ex.: autocomplete a cada tecla).
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+    if not payload.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não foi possível validar as credenciais",
+        )
+    return payload
+
 # --- ATUALIZADO: Agora depende de get_token_from_cookie em vez de oauth2_scheme ---
 async def get_current_user(token: str = Depends(get_token_from_cookie), db: Session = Depends(get_db)):
     """
@@ -1,10 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
+
+from starlette.concurrency import run_in_threadpool
 
 from routers import auth, announcements, employees
 from database import engine, Base
+from services import ad_outbox, autocomplete, retention, sync_jobs, uploads
 
 Base.metadata.create_all(bind=engine)
 
@@ -24,17 +25,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Uploads no form (POST /announcements): corta o corpo acima do limite enquanto ele chega
+app.add_middleware(uploads.MultipartSizeLimitMiddleware, limit=uploads.MAX_UPLOAD_SIZE + uploads.MULTIPART_OVERHEAD)
+
 # 2. Registro das Rotas
 app.include_router(auth.router)
 app.include_router(announcements.router)
 app.include_router(employees.router)
 
 # 3. Configuração de Arquivos Estáticos (Uploads)
-UPLOAD_DIR = "static/uploads/announcements"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Anexos não são mais servidos por StaticFiles: a rota /announcements/{id}/attachment
+# aplica as regras de visibilidade do mural antes de entregar o arquivo.
+
+# 4. Índice em memória do autocomplete de colaboradores (um por worker)
+@app.on_event("startup")
+async def build_autocomplete_index():
+    try:
+        total = await run_in_threadpool(autocomplete.index.rebuild)
+        print(f"🔎 Autocomplete carregado com {total} colaboradores.")
+    except Exception as e:
+        # Sem banco no boot: o índice se reconstrói na primeira busca
+        print(f"❌ Autocomplete não carregado no startup: {e}")
+
+# 5. Sincronização com o AD em segundo plano: retoma a fila e liga o agendamento (AD_SYNC_INTERVAL_MINUTES)
+@app.on_event("startup")
+async def start_sync_worker():
+    try:
+        sync_jobs.start()
+    except Exception as e:
+        print(f"❌ Worker de sincronização não iniciado: {e}")
+
+# 6. Grupos do AD alterados pelo RH: gravados em segundo plano a partir do outbox (ad_group_outbox)
+@app.on_event("startup")
+async def start_ad_outbox_worker():
+    try:
+        ad_outbox.start()
+    except Exception as e:
+        print(f"❌ Worker de grupos do AD não iniciado: {e}")
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# 7. Retenção dos avisos: partições dos próximos meses criadas com antecedência e arquivamento periódico
+@app.on_event("startup")
+async def start_retention_scheduler():
+    try:
+        retention.start()
+    except Exception as e:
+        print(f"❌ Agendamento da retenção não iniciado: {e}")
 
 @app.get("/")
 async def root():
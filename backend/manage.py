@@ -0,0 +1,161 @@
+"""
+Comandos de manutenção do ZeroCore.
+
+Uso (via Docker):
+    docker-compose exec backend python manage.py <comando> [opções]
+"""
+import argparse
+
+from database import SessionLocal
+import models  # Registra todas as tabelas no Base.metadata
+from services.retention import RETENTION_MONTHS
+
+def cmd_recount_acks(args):
+    from services.acknowledgments import recount_ack_counts
+
+    db = SessionLocal()
+    try:
+        fixed = recount_ack_counts(db, args.announcement)
+        print(f"✅ {fixed} aviso(s) com ack_count corrigido.")
+    finally:
+        db.close()
+
+def cmd_refresh_audience(args):
+    from services.audience import refresh_audience
+
+    db = SessionLocal()
+    try:
+        rows = refresh_audience(db, ann_ids=[args.announcement] if args.announcement else None)
+        db.commit()
+        print(f"✅ Público dos avisos recalculado ({rows} linha(s)).")
+    finally:
+        db.close()
+
+def cmd_retention(args):
+    from services.retention import apply_retention
+
+    detach = args.detach or args.drop
+    if detach and args.months is None:
+        print("❌ --detach/--drop exigem --months.")
+        return
+    db = SessionLocal()
+    try:
+        stats = apply_retention(db, args.months, detach, args.drop)
+        print(f"📦 Expirados arquivados: {stats['expired_archived']} | Antigos arquivados: {stats['old_archived']}")
+        if detach:
+            destino = "apagada(s)" if args.drop else "movida(s) para o armazenamento frio"
+            print(f"🧊 {len(stats['partitions'])} partição(ões) {destino}: {', '.join(stats['partitions']) or '-'}")
+    finally:
+        db.close()
+
+def cmd_sync_ad(args):
+    from services import sync_jobs
+
+    db = SessionLocal()
+    try:
+        # Mesma fila/lock da API: nunca roda em paralelo com uma sincronização disparada pelos workers
+        job, created = sync_jobs.enqueue(db, full=args.full, trigger="manual", wake=False)
+        sync_jobs.run_pending()
+        db.refresh(job)
+        if job.status in ("queued", "running"):
+            print(f"⏳ Sincronização {job.id} em andamento em outro processo.")
+        elif job.status == "failed":
+            print(f"❌ Sincronização falhou: {job.error}")
+        else:
+            stats = job.stats
+            print(f"🔄 Sincronização {stats['mode']}: {stats['created']} criado(s) | {stats['updated']} atualizado(s) | "
+                  f"{stats['deactivated']} desativado(s) | {stats['unchanged']} sem alteração")
+            if stats.get("email_conflicts"):
+                print(f"⚠️ Criados sem e-mail (endereço já usado por outro login): {', '.join(stats['email_conflicts'])}")
+    finally:
+        db.close()
+
+def cmd_ad_outbox(args):
+    from services import ad_outbox
+
+    if args.retry_failed:
+        db = SessionLocal()
+        try:
+            print(f"🔁 {ad_outbox.retry_failed(db)} alteração(ões) de grupo devolvida(s) à fila.")
+        finally:
+            db.close()
+    stats = ad_outbox.drain()
+    print(f"📤 Grupos do AD: {stats['sent']} gravado(s) | {stats['failed']} com falha (nova tentativa com backoff)")
+
+def cmd_purge_uploads(args):
+    from services.uploads import purge_stale_uploads
+
+    removed = purge_stale_uploads(args.max_age_hours)
+    print(f"🧹 {removed} upload(s) retomável(is) abandonado(s) removido(s).")
+
+def cmd_attachments_gc(args):
+    from services.attachments import collect_garbage
+
+    db = SessionLocal()
+    try:
+        stats = collect_garbage(db, args.grace_hours)
+        print(f"🗑️ Referências corrigidas: {stats['recounted']} | Blobs removidos: {stats['blobs_removed']} | Órfãos removidos: {stats['orphans_removed']}")
+    finally:
+        db.close()
+
+def cmd_thumbnails(args):
+    from sqlalchemy import select
+    from models.attachments import AttachmentBlob
+    from services.thumbnails import generate_thumbnail
+
+    db = SessionLocal()
+    try:
+        keys = db.execute(select(AttachmentBlob.key).where(AttachmentBlob.thumbnail_key.is_(None))).scalars().all()
+    finally:
+        db.close()
+
+    generated = 0
+    for key in keys:
+        try:
+            if generate_thumbnail(key): generated += 1
+        except Exception as e:
+            print(f"❌ {key}: {e}")
+    print(f"🖼️ {generated} miniatura(s) gerada(s) de {len(keys)} anexo(s) sem prévia.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de manutenção do ZeroCore")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("recount-acks", help="Recalcula o contador de ciências (backfill/reparo)")
+    p.add_argument("--announcement", help="Restringe a um único aviso (UUID)")
+    p.set_defaults(func=cmd_recount_acks)
+
+    p = sub.add_parser("refresh-audience", help="Recalcula o público materializado dos avisos (announcement_audience)")
+    p.add_argument("--announcement", help="Restringe a um único aviso (UUID)")
+    p.set_defaults(func=cmd_refresh_audience)
+
+    p = sub.add_parser("retention", help="Arquiva avisos expirados; com --months também os antigos e, com --detach, tira as partições antigas das tabelas quentes")
+    p.add_argument("--months", type=int, default=None, help=f"Arquiva também os publicados há mais de N meses (ex.: {RETENTION_MONTHS})")
+    p.add_argument("--detach", action="store_true", help="Move as partições de ciência/público anteriores ao horizonte para o schema frio (exige --months)")
+    p.add_argument("--drop", action="store_true", help="Como --detach, mas apaga as partições em vez de movê-las")
+    p.set_defaults(func=cmd_retention)
+
+    p = sub.add_parser("sync-ad", help="Sincroniza colaboradores com o AD (incremental pela marca uSNChanged)")
+    p.add_argument("--full", action="store_true", help="Relê o diretório inteiro em vez de só as alterações")
+    p.set_defaults(func=cmd_sync_ad)
+
+    p = sub.add_parser("ad-outbox", help="Grava no AD as alterações de grupos pendentes (ad_group_outbox)")
+    p.add_argument("--retry-failed", action="store_true", help="Devolve à fila as que esgotaram as tentativas")
+    p.set_defaults(func=cmd_ad_outbox)
+
+    p = sub.add_parser("purge-uploads", help="Remove uploads retomáveis abandonados")
+    p.add_argument("--max-age-hours", type=int, default=24)
+    p.set_defaults(func=cmd_purge_uploads)
+
+    p = sub.add_parser("attachments-gc", help="Remove anexos sem referência do storage")
+    p.add_argument("--grace-hours", type=int, default=24)
+    p.set_defaults(func=cmd_attachments_gc)
+
+    p = sub.add_parser("thumbnails", help="Gera miniaturas que faltam para anexos já publicados")
+    p.set_defaults(func=cmd_thumbnails)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 # Importa os modelos para que sejam registrados no Base.metadata
 from .users import User, Employee
 from .announcements import Announcement
+from .attachments import AttachmentBlob
+from .sync import DirectorySyncState, DirectorySyncJob, ADGroupOutbox
 
-# Quando alguém fizer "from models import User", vai funcionar.
\ No newline at end of file
+# Quando alguém fizer "from models import User", vai funcionar.
@@ -1,21 +1,51 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Boolean, Table
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, ForeignKey, DateTime, Boolean, Integer, Table, Index, Computed, DDL, event
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.orm import relationship
 from database import Base
 
+# Tabelas usuários × avisos são particionadas por mês pela data de publicação do aviso
+# (announcement_created_at, cópia de announcements.created_at). As partições são criadas e
+# desanexadas por services/retention.py.
+
 # Tabela associativa para Ciência (Quem leu o quê)
 announcement_acknowledgments = Table(
     "announcement_acknowledgments",
     Base.metadata,
     Column("user_id", UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True),
     Column("announcement_id", UUID(as_uuid=True), ForeignKey("announcements.id"), primary_key=True),
-    Column("acknowledged_at", DateTime, default=datetime.utcnow)
+    Column("announcement_created_at", DateTime, primary_key=True),
+    Column("acknowledged_at", DateTime, default=datetime.utcnow),
+    # A PK começa por user_id; este índice atende as leituras por aviso (logs, relatórios)
+    Index("ix_announcement_acknowledgments_ann_at", "announcement_id", "acknowledged_at"),
+    postgresql_partition_by="RANGE (announcement_created_at)"
+)
+
+# Público-alvo materializado na escrita (quem pode ver cada aviso). Mantido por services/audience.py
+announcement_audience = Table(
+    "announcement_audience",
+    Base.metadata,
+    Column("announcement_id", UUID(as_uuid=True), ForeignKey("announcements.id", ondelete="CASCADE"), primary_key=True),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("announcement_created_at", DateTime, primary_key=True),
+    # A PK atende "quem é o público do aviso" (pendentes); este índice atende o feed por usuário
+    Index("ix_announcement_audience_user_ann", "user_id", "announcement_id"),
+    postgresql_partition_by="RANGE (announcement_created_at)"
 )
 
+# Banco criado por create_all (sem Alembic): a tabela pai nasce sem partições e qualquer INSERT falharia.
+# A DEFAULT é criada junto; as mensais vêm do startup (services/retention.py).
+for _table in (announcement_acknowledgments, announcement_audience):
+    event.listen(_table, "after_create", DDL("CREATE TABLE IF NOT EXISTS %(table)s_default PARTITION OF %(table)s DEFAULT"))
+
 class Announcement(Base):
     __tablename__ = "announcements"
+    __table_args__ = (
+        # Índice da paginação keyset do mural: filtra por arquivamento e ordena por (created_at, id)
+        Index("ix_announcements_archived_created_id", "is_archived", "created_at", "id"),
+        Index("ix_announcements_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
@@ -25,16 +55,30 @@ class Announcement(Base):
     
     attachment_url = Column(String, nullable=True)
     attachment_name = Column(String, nullable=True)
+    # Arquivo no storage endereçado por conteúdo (nulo para anexos antigos em static/uploads/announcements)
+    attachment_key = Column(String, ForeignKey("attachment_blobs.key"), nullable=True, index=True)
     
+    # Documento da busca textual, mantido pelo próprio Postgres (título com peso A, conteúdo com peso B)
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('portuguese', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('portuguese', coalesce(content, '')), 'B')",
+        persisted=True
+    ))
+
     is_archived = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Depois desta data o aviso é arquivado automaticamente (manage.py retention)
+    expires_at = Column(DateTime, nullable=True)
+    # Contador desnormalizado de ciências, mantido junto com a inserção em announcement_acknowledgments
+    ack_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     
     # Relacionamentos
     author = relationship("User", back_populates="announcements")
-    # Lista de usuários que deram ciência
+    # Lista de usuários que deram ciência (só leitura: a gravação é feita por services/acknowledgments.py)
     acknowledged_by = relationship(
         "User", 
         secondary=announcement_acknowledgments,
-        backref="acknowledged_announcements"
+        backref="acknowledged_announcements",
+        viewonly=True
     )
\ No newline at end of file
@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger
+from database import Base
+
+class AttachmentBlob(Base):
+    """Arquivo único no storage de anexos (endereçado pelo SHA-256), compartilhado entre avisos."""
+    __tablename__ = "attachment_blobs"
+
+    key = Column(String, primary_key=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+    # Miniatura/prévia gerada em segundo plano (mesma pasta do original no storage)
+    thumbnail_key = Column(String, nullable=True)
+
+    # Quantos avisos apontam para este arquivo (announcements.attachment_key)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_referenced_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, BigInteger, Boolean, Integer, Text, JSON, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from database import Base
+
+class DirectorySyncState(Base):
+    """Marca d'água da sincronização incremental com o AD (uma linha por origem)."""
+    __tablename__ = "directory_sync_state"
+
+    source = Column(String, primary_key=True)  # ex.: "ad_users"
+    # highestCommittedUSN lido antes da última leitura bem-sucedida; só vale no DC que o emitiu
+    usn = Column(BigInteger, nullable=True)
+    dc = Column(String, nullable=True)  # dsServiceName do DC
+    last_sync_at = Column(DateTime, default=datetime.utcnow)
+    last_full_sync_at = Column(DateTime, nullable=True)
+
+class DirectorySyncJob(Base):
+    """Execução da sincronização com o AD em segundo plano (histórico + progresso)."""
+    __tablename__ = "directory_sync_jobs"
+    __table_args__ = (
+        # No máximo uma execução na fila ou rodando por origem (vale entre todos os workers)
+        Index(
+            "uq_directory_sync_jobs_active", "source", unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    source = Column(String, nullable=False, default="ad_users")
+    status = Column(String, nullable=False, default="queued")  # queued | running | succeeded | failed
+    full = Column(Boolean, nullable=False, default=False)
+    trigger = Column(String, nullable=False, default="manual")  # manual | schedule
+    requested_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+
+    processed = Column(Integer, nullable=False, default=0, server_default="0")
+    stats = Column(JSON, nullable=True)  # created/updated/deactivated/unchanged (+ mode no fim)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class ADGroupOutbox(Base):
+    """
+    Grupos ZC_DEPT_ a gravar no AD (write-behind). Gravada na mesma transação da mudança de
+    Employee.meta["depts"]; uma linha por usuário com o estado desejado mais recente (edições seguidas
+    se fundem). O worker apaga a linha quando o AD confirma.
+    """
+    __tablename__ = "ad_group_outbox"
+
+    username = Column(String, primary_key=True)
+    depts = Column(JSON, nullable=False)
+    version = Column(Integer, nullable=False, default=1)  # Muda a cada nova edição: o worker só apaga o que enviou
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from database import Base
@@ -20,6 +20,11 @@ class User(Base):
 
 class Employee(Base):
     __tablename__ = "employees"
+    __table_args__ = (
+        # Ordem do diretório (paginação keyset por nome, id). Os índices trigram da busca
+        # (immutable_unaccent(full_name) e de users.username) usam funções e ficam só na migração.
+        Index("ix_employees_full_name_id", "full_name", "id"),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), unique=True)
     full_name = Column(String, nullable=False)
@@ -1,78 +1,282 @@
 import os
+import io
+import csv
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Query
+import base64
+import json
+import time
+import asyncio
+from datetime import datetime, date, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Query, Body, Header, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import tuple_, exists, select, func, cast, Float
 from typing import Optional, List
-from database import get_db
-from models.announcements import Announcement
-from models.users import User, Employee
+from database import get_db, SessionLocal
+from models.announcements import Announcement, announcement_acknowledgments
+from models.attachments import AttachmentBlob
+from models.users import Employee
 from auth.security import get_current_user
+from services.acknowledgments import acknowledge, acknowledged_users_query, pending_users_query, count_pending
+from services import uploads, attachments, thumbnails, events, audience
+from services.storage import get_storage
+from services.downloads import file_response
 
 router = APIRouter(prefix="/announcements", tags=["Mural de Avisos"])
 
-UPLOAD_DIR = "static/uploads/announcements"
+LEGACY_UPLOAD_DIR = "static/uploads/announcements"
+DEFAULT_PAGE_SIZE = int(os.getenv("ANNOUNCEMENTS_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = 100
+SEARCH_CONFIG = "portuguese"  # Mesmo dicionário da coluna gerada announcements.search_vector
+SNIPPET_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=12, FragmentDelimiter= … "
+EXPORT_BATCH_SIZE = 1000  # Linhas buscadas por vez no cursor do servidor durante exportações
+UNREAD_CACHE_SECONDS = float(os.getenv("UNREAD_COUNT_CACHE_SECONDS", "5"))
+
+def _encode_cursor(created_at: datetime, ann_id, rank: Optional[float] = None) -> str:
+    """
+    Gera o cursor opaco (base64) a partir da chave (created_at, id) do último item da página.
+    Em buscas textuais a ordem começa pela relevância, então o rank também entra no cursor.
+    """
+    raw = f"{created_at.isoformat()}|{ann_id}"
+    if rank is not None:
+        raw += f"|{rank!r}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _can_manage(current_user: dict) -> bool:
+    """Gestores e perfis de comunicação (TI/RH) — mesma regra que libera ver arquivados."""
+    permissions = current_user.get("permissions", [])
+    return current_user.get("role") in ["admin", "diretoria", "coordenador"] or \
+           "post_general" in permissions or \
+           "post_tech" in permissions
+
+def _visibility_filter(current_user: dict):
+    """Predicado SQL com os avisos que o usuário pode ver: pertencer ao público materializado (announcement_audience)."""
+    return audience.audience_filter(current_user["id"])
+
+def _is_visible(current_user: dict, category: str, target_dept: Optional[str]) -> bool:
+    """
+    Regra do público (services/audience.py) avaliada em Python com os dados do token,
+    para filtrar os eventos do mural sem consultar o banco a cada evento.
+    """
+    if category in audience.PUBLIC_CATEGORIES:
+        return True
+    if category == "OPS_MGMT":
+        return current_user.get("role") in audience.MANAGEMENT_ROLES
+    return category == "SECTOR" and target_dept in current_user.get("depts", [])
+
+def _publish_change(db: Session, event_type: str, ann: Announcement):
+    # Aviso novo, arquivado ou reativado muda o contador de não lidos de todo o público
+    audience.forget_unread()
+    events.publish(db, event_type, {"id": str(ann.id), "category": ann.category, "target_dept": ann.target_dept})
+
+def _attachment_url(ann_id, has_attachment: bool) -> Optional[str]:
+    """URL pública do anexo: sempre a rota protegida, nunca o caminho no storage."""
+    return f"/announcements/{ann_id}/attachment" if has_attachment else None
+
+def _visible_attachment(db: Session, ann_id: str, current_user: dict):
+    """Dados de anexo do aviso, ou None se o usuário não pode vê-lo no mural."""
+    query = db.query(
+        Announcement.attachment_key, Announcement.attachment_url, Announcement.attachment_name,
+        AttachmentBlob.thumbnail_key
+    ).outerjoin(AttachmentBlob, AttachmentBlob.key == Announcement.attachment_key) \
+     .filter(Announcement.id == ann_id, _visibility_filter(current_user))
+    if not _can_manage(current_user):
+        query = query.filter(Announcement.is_archived == False)
+    return query.first()
+
+def _csv_response(rows, header: List[str], filename: str) -> StreamingResponse:
+    """
+    Envia as linhas como CSV em streaming (separador ';' e BOM para abrir direto no Excel).
+    Cada lote de EXPORT_BATCH_SIZE linhas vira um pedaço da resposta: a memória fica constante.
+    """
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=";")
+        buffer.write("\ufeff")
+        writer.writerow(header)
+        for i, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if i % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _iter_ack_rows(db: Session, ann: Announcement):
+    """Linhas (confirmados e depois pendentes) de um aviso, lidas com cursor do lado do servidor."""
+    opts = {"yield_per": EXPORT_BATCH_SIZE}
+    for row in db.execute(acknowledged_users_query(ann).order_by("acknowledged_at"), execution_options=opts):
+        yield ["CIENTE", row.name, row.username, row.dept, row.acknowledged_at.strftime("%Y-%m-%d %H:%M:%S") if row.acknowledged_at else ""]
+    for row in db.execute(pending_users_query(ann).order_by("name"), execution_options=opts):
+        yield ["PENDENTE", row.name, row.username, row.dept, ""]
+
+def _decode_cursor(cursor: str):
+    """Converte o cursor recebido de volta em (created_at, id, rank). Lança 400 se estiver corrompido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, ann_id, *rank = raw.split("|", 2)
+        return datetime.fromisoformat(created_at), uuid.UUID(ann_id), float(rank[0]) if rank else None
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
 
 @router.get("")
 async def list_announcements(
     category: Optional[str] = Query(None),
     show_archived: bool = Query(False),
+    q: Optional[str] = Query(None, max_length=200),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db), 
     current_user: dict = Depends(get_current_user)
 ):
     """
     Lista os anúncios baseando-se em permissões, filtros de categoria e estado de arquivamento.
+    Paginação por cursor (keyset) sobre (created_at, id): o cliente repassa o `next_cursor`
+    da resposta anterior para buscar a próxima página.
+    O feed inteiro sai de um único SELECT (ciência via EXISTS, autor via join, contagem desnormalizada),
+    sem carregar relacionamentos do ORM por linha.
+    Com `q`, faz busca textual (dicionário português, título pesa mais que o conteúdo), ordena por
+    relevância e devolve trechos destacados com <mark> em `title_highlight`/`snippet`.
     """
-    role = current_user.get("role")
-    user_depts = current_user.get("depts", [])
-    permissions = current_user.get("permissions", [])
-    
     # 1. Filtro de Arquivados (Apenas gestores/TI/RH podem alternar para ver arquivados)
-    can_see_archived = role in ["admin", "diretoria", "coordenador"] or \
-                       "post_general" in permissions or \
-                       "post_tech" in permissions
-
-    is_archived_target = True if (show_archived and can_see_archived) else False
+    is_archived_target = True if (show_archived and _can_manage(current_user)) else False
     
-    # Inicia a query base filtrando pelo estado de arquivamento
-    query = db.query(Announcement).filter(Announcement.is_archived == is_archived_target)
+    acks = announcement_acknowledgments.c
+
+    # Ciência do usuário atual: EXISTS na tabela associativa (não carrega a lista de usuários)
+    has_acknowledged = exists().where(
+        acks.announcement_id == Announcement.id,
+        acks.announcement_created_at == Announcement.created_at,
+        acks.user_id == current_user["id"]
+    ).label("has_acknowledged")
+
+    # Inicia a query base (colunas simples, sem hidratar entidades) filtrando pelo estado de arquivamento
+    query = db.query(
+        Announcement.id,
+        Announcement.title,
+        Announcement.content,
+        Announcement.category,
+        Announcement.target_dept,
+        Announcement.attachment_url,
+        Announcement.attachment_name,
+        AttachmentBlob.thumbnail_key,
+        Announcement.created_at,
+        Announcement.expires_at,
+        Announcement.is_archived,
+        Employee.full_name.label("author_name"),
+        Announcement.ack_count,
+        has_acknowledged,
+    ).outerjoin(Employee, Employee.user_id == Announcement.created_by) \
+     .outerjoin(AttachmentBlob, AttachmentBlob.key == Announcement.attachment_key) \
+     .filter(Announcement.is_archived == is_archived_target)
 
     # 2. Filtro de Categoria (opcional vindo do front-end)
     if category and category != "ALL":
         query = query.filter(Announcement.category == category)
 
     # 3. Regra de Visibilidade (O que o usuário PODE ver)
-    visible_categories = ["GENERAL", "TECH"]
-    if role in ["admin", "diretoria", "coordenador", "supervisor"]:
-        visible_categories.append("OPS_MGMT")
-    
-    query = query.filter(
-        or_(
-            Announcement.category.in_(visible_categories),
-            and_(Announcement.category == "SECTOR", Announcement.target_dept.in_(user_depts))
+    query = query.filter(_visibility_filter(current_user))
+
+    # 4. Busca textual (índice GIN sobre a coluna gerada search_vector)
+    search = q.strip() if q else None
+    sort_key = [Announcement.created_at, Announcement.id]
+    if search:
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, search)
+        # ts_rank_cd devolve real; em double precision o rank do cursor volta idêntico na comparação
+        rank = cast(func.ts_rank_cd(Announcement.search_vector, tsquery), Float)
+        query = query.filter(Announcement.search_vector.op("@@")(tsquery)).add_columns(
+            rank.label("rank"),
+            func.ts_headline(SEARCH_CONFIG, Announcement.title, tsquery, "HighlightAll=true, StartSel=<mark>, StopSel=</mark>").label("title_highlight"),
+            func.ts_headline(SEARCH_CONFIG, Announcement.content, tsquery, SNIPPET_OPTIONS).label("snippet"),
         )
-    )
+        sort_key.insert(0, rank)
+
+    # 5. Paginação keyset: continua estritamente "depois" do último item entregue
+    if cursor:
+        cursor_created_at, cursor_id, cursor_rank = _decode_cursor(cursor)
+        cursor_key = [cursor_created_at, cursor_id]
+        if search:
+            if cursor_rank is None:
+                raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+            cursor_key.insert(0, cursor_rank)
+        query = query.filter(tuple_(*sort_key) < tuple_(*cursor_key))
+
+    # Busca um item extra só para saber se existe próxima página
+    rows = query.order_by(*[col.desc() for col in sort_key]).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.created_at, last.id, last.rank if search else None)
 
-    announcements = query.order_by(Announcement.created_at.desc()).all()
-
-    results = []
-    for ann in announcements:
-        has_acknowledged = any(str(u.id) == current_user["id"] for u in ann.acknowledged_by)
-        results.append({
-            "id": str(ann.id),
-            "title": ann.title,
-            "content": ann.content,
-            "category": ann.category,
-            "target_dept": ann.target_dept,
-            "attachment_url": ann.attachment_url,
-            "attachment_name": ann.attachment_name,
-            "created_at": ann.created_at,
-            "author_name": ann.author.employee.full_name if ann.author and ann.author.employee else "Sistema",
-            "has_acknowledged": has_acknowledged,
-            "ack_count": len(ann.acknowledged_by),
-            "is_archived": ann.is_archived
-        })
-    return results
+    results = [
+        {
+            "id": str(row.id),
+            "title": row.title,
+            "content": row.content,
+            "category": row.category,
+            "target_dept": row.target_dept,
+            "attachment_url": _attachment_url(row.id, row.attachment_url is not None),
+            "attachment_name": row.attachment_name,
+            "thumbnail_url": f"/announcements/{row.id}/thumbnail" if row.thumbnail_key else None,
+            "created_at": row.created_at,
+            "expires_at": row.expires_at,
+            "author_name": row.author_name or "Sistema",
+            "has_acknowledged": row.has_acknowledged,
+            "ack_count": row.ack_count,
+            "is_archived": row.is_archived,
+            **({"title_highlight": row.title_highlight, "snippet": row.snippet} if search else {})
+        } for row in rows
+    ]
+    return {"items": results, "next_cursor": next_cursor}
+
+@router.get("/unread-count")
+async def get_unread_count(
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Contador leve para o badge do menu: avisos ativos visíveis e ainda sem ciência, por categoria.
+    O anti-join (NOT EXISTS) é resolvido só pela PK (user_id, announcement_id) de
+    announcement_acknowledgments. A resposta fica em cache por alguns segundos por usuário
+    (descartada quando ele dá ciência, quando o público dele muda e quando um aviso é publicado ou arquivado).
+    """
+    response.headers["Cache-Control"] = f"private, max-age={int(UNREAD_CACHE_SECONDS)}"
+    key = str(current_user["id"])
+    now = time.monotonic()
+    cached = audience.unread_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    acks = announcement_acknowledgments.c
+    rows = db.execute(
+        select(Announcement.category, func.count())
+        .where(Announcement.is_archived == False, _visibility_filter(current_user))
+        .where(~exists().where(
+            acks.user_id == current_user["id"],
+            acks.announcement_id == Announcement.id,
+            acks.announcement_created_at == Announcement.created_at,
+        ))
+        .group_by(Announcement.category)
+    ).all()
+    by_category = {category: count for category, count in rows}
+    result = {"total": sum(by_category.values()), "by_category": by_category}
+
+    if len(audience.unread_cache) > 10000:
+        for k in [k for k, (expires, _) in audience.unread_cache.items() if expires <= now]:
+            del audience.unread_cache[k]
+    audience.unread_cache[key] = (now + UNREAD_CACHE_SECONDS, result)
+    return result
 
 @router.post("")
 async def create_announcement(
@@ -80,12 +284,16 @@ async def create_announcement(
     content: str = Form(...),
     category: str = Form(...),
     target_dept: Optional[str] = Form(None),
+    expires_at: Optional[datetime] = Form(None),
     file: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None),
     db: Session = Depends(get_db), 
     current_user: dict = Depends(get_current_user)
 ):
     """
     Cria um novo anúncio com suporte a upload.
+    O anexo vem direto no form (`file`) ou de um upload retomável já concluído (`upload_id`).
+    Com `expires_at`, o aviso é arquivado automaticamente depois dessa data.
     """
     role = current_user.get("role")
     permissions = current_user.get("permissions", [])
@@ -101,39 +309,193 @@ async def create_announcement(
 
     if not can_post:
         raise HTTPException(status_code=403, detail="Sem permissão para publicar.")
+    if expires_at and expires_at.tzinfo:
+        expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)  # Coluna em UTC sem fuso
+    if expires_at and expires_at <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="A data de expiração deve estar no futuro.")
 
+    ann_id = uuid.uuid4()
     file_url, file_name = None, None
+    # O arquivo é recebido em staging e só entra no storage endereçado por conteúdo
+    # depois que a referência ao blob é comitada junto com o aviso
+    stored, file_key = None, None
     if file:
-        file_ext = os.path.splitext(file.filename)[1]
-        unique_name = f"{uuid.uuid4()}{file_ext}"
-        if not os.path.exists(UPLOAD_DIR): os.makedirs(UPLOAD_DIR, exist_ok=True)
-        file_path = os.path.join(UPLOAD_DIR, unique_name)
-        with open(file_path, "wb") as buffer: buffer.write(await file.read())
-        file_url, file_name = f"/static/uploads/announcements/{unique_name}", file.filename
+        stored = await uploads.save_upload(file, uploads.STAGING_DIR)
+    elif upload_id:
+        stored = await run_in_threadpool(uploads.finalize_resumable, upload_id, current_user["id"], uploads.STAGING_DIR)
+    if stored:
+        file_key = attachments.add_reference(db, stored)
+        # O storage não é servido diretamente: a URL gravada é a rota de download, que aplica a visibilidade
+        file_url, file_name = _attachment_url(ann_id, True), stored["filename"]
 
     new_ann = Announcement(
-        title=title, content=content, category=category, target_dept=target_dept,
-        attachment_url=file_url, attachment_name=file_name, created_by=current_user["id"]
+        id=ann_id, title=title, content=content, category=category, target_dept=target_dept,
+        attachment_url=file_url, attachment_name=file_name, attachment_key=file_key,
+        expires_at=expires_at, created_by=current_user["id"]
     )
     db.add(new_ann)
+    db.flush()
+    # Fan-out na escrita: grava quem é o público do aviso junto com ele
+    audience.refresh_audience(db, ann_ids=[new_ann.id])
+    _publish_change(db, "announcement_created", new_ann)
     db.commit()
     db.refresh(new_ann)
+
+    if stored:
+        await run_in_threadpool(attachments.materialize, stored, file_key)
+        # Prévia gerada em segundo plano, depois que o arquivo já está no storage
+        thumbnails.schedule(file_key)
     return {"message": "Aviso publicado.", "id": str(new_ann.id)}
 
+@router.get("/events")
+async def stream_announcement_events(
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Server-Sent Events do mural: novos avisos, arquivamentos e totais de ciência.
+    Substitui o polling: o cliente só recarrega a lista quando algo muda.
+    """
+    queue = events.broker.subscribe()
+
+    async def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=events.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # Mantém a conexão viva em proxies com timeout de inatividade
+                    continue
+                if event["type"] != "resync" and not _is_visible(current_user, event.get("category"), event.get("target_dept")):
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            events.broker.unsubscribe(queue)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=headers)
+
+@router.post("/uploads")
+async def create_resumable_upload(
+    filename: str = Body(...),
+    size: int = Body(..., gt=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Inicia um upload retomável para anexos grandes. O cliente envia os blocos com
+    PUT /uploads/{upload_id} e, ao terminar, publica o aviso passando o `upload_id`.
+    """
+    return await run_in_threadpool(uploads.create_resumable, current_user["id"], filename, size)
+
+@router.get("/uploads/{upload_id}")
+async def get_resumable_upload(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Consulta quantos bytes já chegaram (para retomar após queda de conexão).
+    """
+    return await run_in_threadpool(uploads.get_resumable, upload_id, current_user["id"])
+
+@router.put("/uploads/{upload_id}")
+async def append_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Recebe o próximo bloco (corpo cru da requisição) a partir do byte `Upload-Offset`.
+    """
+    return await uploads.append_resumable(upload_id, current_user["id"], upload_offset, request.stream())
+
+@router.post("/acknowledge")
+async def acknowledge_announcements_bulk(
+    ann_ids: List[uuid.UUID] = Body(..., embed=True, max_length=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Registra ciência em vários avisos de uma vez (ex.: "marcar todos como lidos").
+    IDs inexistentes, fora do público do usuário, arquivados ou já confirmados são ignorados.
+    """
+    acknowledged = acknowledge(db, current_user["id"], ann_ids)
+    audience.forget_unread([current_user["id"]])
+    return {"message": "Ciência registrada.", "acknowledged": acknowledged}
+
 @router.post("/{ann_id}/acknowledge")
 async def acknowledge_announcement(
     ann_id: str,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    ann = db.query(Announcement).filter(Announcement.id == ann_id).first()
-    user = db.query(User).filter(User.id == current_user["id"]).first()
-    if not ann: raise HTTPException(status_code=404, detail="Aviso não encontrado.")
-    if user not in ann.acknowledged_by:
-        ann.acknowledged_by.append(user)
-        db.commit()
+    acknowledged = acknowledge(db, current_user["id"], [ann_id])
+    audience.forget_unread([current_user["id"]])
+    if not acknowledged:
+        # Nada inserido: ou já havia ciência, ou o aviso não existe / não é do público / está arquivado
+        acks = announcement_acknowledgments.c
+        if not db.query(exists().where(acks.announcement_id == ann_id, acks.user_id == current_user["id"])).scalar():
+            raise HTTPException(status_code=404, detail="Aviso não encontrado.")
     return {"message": "Ciência registrada."}
 
+@router.get("/{ann_id}/attachment")
+async def download_attachment(
+    ann_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Baixa o anexo do aviso aplicando as mesmas regras de visibilidade do mural.
+    Suporta Range e If-None-Match; o ETag é o próprio hash do conteúdo.
+    """
+    ann = _visible_attachment(db, ann_id, current_user)
+    if not ann or not ann.attachment_url:
+        raise HTTPException(status_code=404, detail="Anexo não encontrado.")
+
+    if ann.attachment_key:
+        storage = get_storage()
+        key = ann.attachment_key
+        sha256 = os.path.splitext(os.path.basename(key))[0]
+        try:
+            size = await run_in_threadpool(storage.size, key)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Anexo não encontrado.")
+        return file_response(request, lambda: storage.open(key), size, f'"{sha256}"', ann.attachment_name, f"blobs/{key}")
+
+    # Anexos antigos (antes do storage endereçado por conteúdo): arquivo com nome UUID, também imutável
+    stored_name = os.path.basename(ann.attachment_url)
+    path = os.path.join(LEGACY_UPLOAD_DIR, stored_name)
+    try:
+        stat = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Anexo não encontrado.")
+    etag = f'"{stored_name}-{stat.st_size}"'
+    return file_response(request, lambda: open(path, "rb"), stat.st_size, etag, ann.attachment_name, f"announcements/{stored_name}")
+
+@router.get("/{ann_id}/thumbnail")
+async def download_thumbnail(
+    ann_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Miniatura do anexo (imagem reduzida ou 1ª página do PDF), com as mesmas regras do anexo.
+    """
+    ann = _visible_attachment(db, ann_id, current_user)
+    if not ann or not ann.thumbnail_key:
+        raise HTTPException(status_code=404, detail="Prévia não encontrada.")
+
+    storage = get_storage()
+    key = ann.thumbnail_key
+    try:
+        size = await run_in_threadpool(storage.size, key)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Prévia não encontrada.")
+    etag = f'"{os.path.basename(key)}"'
+    return file_response(request, lambda: storage.open(key), size, etag, "preview.jpg", f"blobs/{key}", inline=True)
+
 @router.post("/{ann_id}/archive")
 async def archive_announcement(
     ann_id: str,
@@ -153,6 +515,7 @@ async def archive_announcement(
         raise HTTPException(status_code=403, detail="Sem permissão para arquivar.")
         
     ann.is_archived = True
+    _publish_change(db, "announcement_archived", ann)
     db.commit()
     return {"message": "Aviso arquivado."}
 
@@ -176,43 +539,126 @@ async def unarchive_announcement(
         raise HTTPException(status_code=403, detail="Sem permissão para desarquivar este aviso.")
         
     ann.is_archived = False
+    _publish_change(db, "announcement_unarchived", ann)
     db.commit()
     return {"message": "Aviso restaurado com sucesso."}
 
+@router.get("/{ann_id}/logs/summary")
+async def get_announcement_logs_summary(
+    ann_id: str,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Totais de ciência do aviso (confirmados vs. pendentes), sem as listas.
+    """
+    ann = db.query(Announcement).filter(Announcement.id == ann_id).first()
+    if not ann: raise HTTPException(status_code=404)
+
+    return {"acknowledged": ann.ack_count, "pending": count_pending(db, ann)}
+
 @router.get("/{ann_id}/logs")
 async def get_announcement_logs(
     ann_id: str,
+    status: str = Query("pending", pattern="^(pending|acknowledged)$"),
+    sort: str = Query("name", pattern="^(name|dept|acknowledged_at)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Retorna a lista de ciência com nomes completos.
+    Retorna uma página da lista de ciência (confirmados ou pendentes) com nomes completos.
+    Pendentes são calculados no banco (NOT EXISTS); os totais ficam em /logs/summary.
     """
     ann = db.query(Announcement).filter(Announcement.id == ann_id).first()
     if not ann: raise HTTPException(status_code=404)
 
-    # Acessamos u.employee.full_name sem qualquer manipulação de string para garantir o nome completo
-    acknowledged = [
-        {
-            "name": u.employee.full_name if (u.employee and u.employee.full_name) else u.username, 
-            "dept": u.employee.department if u.employee else "N/A"
-        }
-        for u in ann.acknowledged_by
-    ]
+    query = acknowledged_users_query(ann) if status == "acknowledged" else pending_users_query(ann)
 
-    pending_query = db.query(User).join(Employee).filter(User.is_active == True)
-    if ann.category == "SECTOR":
-        pending_query = pending_query.filter(Employee.department.ilike(f"%{ann.target_dept}%"))
-    
-    all_target_users = pending_query.all()
-    ack_ids = [u.id for u in ann.acknowledged_by]
-    
-    pending = [
+    # Pendentes não têm data de ciência: ordena por nome nesse caso
+    if sort == "acknowledged_at" and status == "pending":
+        sort = "name"
+    sort_col = query.selected_columns[sort]
+    sort_col = sort_col.desc() if order == "desc" else sort_col.asc()
+
+    rows = db.execute(
+        query.order_by(sort_col, query.selected_columns.username).limit(limit + 1).offset(offset)
+    ).all()
+
+    has_more = len(rows) > limit
+    items = [
         {
-            "name": u.employee.full_name if (u.employee and u.employee.full_name) else u.username, 
-            "dept": u.employee.department if u.employee else "N/A"
-        }
-        for u in all_target_users if u.id not in ack_ids
+            "name": row.name,
+            "dept": row.dept,
+            "acknowledged_at": getattr(row, "acknowledged_at", None)
+        } for row in rows[:limit]
     ]
+    return {"items": items, "next_offset": offset + limit if has_more else None}
+
+
+ACK_CSV_HEADER = ["status", "nome", "usuario", "setor", "ciente_em"]
+
+@router.get("/logs.csv")
+async def export_announcements_logs_csv(
+    start: date = Query(...),
+    end: date = Query(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exporta em CSV a situação de ciência de todos os avisos publicados no período [start, end].
+    """
+    if not _can_manage(current_user):
+        raise HTTPException(status_code=403, detail="Sem permissão para exportar relatórios.")
+    if end < start:
+        raise HTTPException(status_code=400, detail="Período inválido.")
+
+    def rows():
+        # Sessões próprias: o gerador roda depois que a dependência get_db já foi encerrada.
+        # São duas porque o cursor de avisos continua aberto enquanto as listas são lidas.
+        db, ack_db = SessionLocal(), SessionLocal()
+        try:
+            anns = db.execute(
+                select(Announcement)
+                .where(Announcement.created_at >= start, Announcement.created_at < end + timedelta(days=1))
+                .order_by(Announcement.created_at, Announcement.id),
+                execution_options={"yield_per": 100}
+            ).scalars()
+            for ann in anns:
+                prefix = [str(ann.id), ann.title, ann.created_at.strftime("%Y-%m-%d %H:%M:%S") if ann.created_at else ""]
+                for row in _iter_ack_rows(ack_db, ann):
+                    yield prefix + row
+        finally:
+            ack_db.close()
+            db.close()
+
+    return _csv_response(
+        rows(),
+        ["aviso_id", "aviso", "publicado_em"] + ACK_CSV_HEADER,
+        f"ciencia_{start.isoformat()}_{end.isoformat()}.csv"
+    )
+
+@router.get("/{ann_id}/logs.csv")
+async def export_announcement_logs_csv(
+    ann_id: str,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exporta em CSV quem confirmou (com data) e quem ainda está pendente em um aviso.
+    """
+    if not _can_manage(current_user):
+        raise HTTPException(status_code=403, detail="Sem permissão para exportar relatórios.")
+
+    ann = db.query(Announcement).filter(Announcement.id == ann_id).first()
+    if not ann: raise HTTPException(status_code=404)
+
+    def rows():
+        stream_db = SessionLocal()
+        try:
+            yield from _iter_ack_rows(stream_db, ann)
+        finally:
+            stream_db.close()
 
-    return {"acknowledged": acknowledged, "pending": pending}
\ No newline at end of file
+    return _csv_response(rows(), ACK_CSV_HEADER, f"ciencia_{ann.id}.csv")
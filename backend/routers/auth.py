@@ -5,8 +5,10 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from database import get_db
 from models.users import User, Employee
-from auth.ad_service import ADService
+from auth.ad_service import ADService, ADTimeoutError, call_ad
 from auth.security import create_access_token
+from services import ad_outbox
+from services.audience import refresh_audience
 
 router = APIRouter(prefix="/auth", tags=["Autenticação"])
 
@@ -19,11 +21,15 @@ async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), 
     db: Session = Depends(get_db)
 ):
-    ad_user = ADService.authenticate(form_data.username, form_data.password)
+    try:
+        ad_user = await call_ad(ADService.authenticate, form_data.username, form_data.password)
+    except ADTimeoutError:
+        raise HTTPException(status_code=503, detail="O AD não respondeu a tempo. Tente novamente em instantes.")
     if not ad_user:
         raise HTTPException(status_code=401, detail="Usuário ou senha incorretos no AD")
 
     db_user = db.query(User).filter(User.username == ad_user["username"]).first()
+    depts = ad_user["depts"]
     
     # Sincronização básica do usuário no Banco
     if not db_user:
@@ -43,20 +49,36 @@ async def login_for_access_token(
             full_name=ad_user["full_name"],
             department=ad_user["depts"][0] if ad_user["depts"] else "Geral",
             title=ad_user["title"],
-            location="Matriz"
+            location="Matriz",
+            meta={"depts": ad_user["depts"]}
         )
         db.add(employee)
+        refresh_audience(db, user_ids=[db_user.id])
     else:
+        # Setores vindos do AD no login também definem o público dos avisos setoriais
+        emp = db_user.employee
+        if emp is not None and ad_outbox.is_pending(db, db_user.username):
+            # Edição do RH ainda não gravada no AD: o banco está à frente, os grupos do AD não a desfazem
+            depts = (emp.meta or {}).get("depts", depts)
+        depts_changed = emp is not None and sorted((emp.meta or {}).get("depts") or []) != sorted(depts)
+        active_changed = db_user.is_active != ad_user["is_active"]
+
         db_user.is_active = ad_user["is_active"]
-        if db_user.employee:
-            db_user.employee.full_name = ad_user["full_name"]
+        if emp:
+            emp.full_name = ad_user["full_name"]
+            if depts_changed:
+                meta = dict(emp.meta) if emp.meta else {}
+                meta["depts"] = depts
+                emp.meta = meta
+        if depts_changed or active_changed:
+            refresh_audience(db, user_ids=[db_user.id])
 
     db.commit()
 
     access_token = create_access_token(data={
         "sub": db_user.username,
         "role": db_user.role,
-        "depts": ad_user["depts"],
+        "depts": depts,
         "permissions": ad_user["permissions"]
     })
 
@@ -1,49 +1,128 @@
+import os
+import base64
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy import select, func, or_, tuple_, cast, Float, literal
 from typing import Optional, List, Dict
 from datetime import datetime
 from database import get_db
 from models.users import User, Employee
-from auth.ad_service import ADService
-from auth.security import get_current_user
+from models.sync import DirectorySyncJob
+from auth.security import get_current_user, get_token_payload
+from schemas.employees import EmployeePage, AutocompleteItem
+from services import ad_outbox, autocomplete, sync_jobs
+from services.audience import refresh_audience
 import uuid
 
 router = APIRouter(prefix="/employees", tags=["Gestão de Colaboradores"])
 
-@router.get("")
+DEFAULT_PAGE_SIZE = int(os.getenv("EMPLOYEES_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = 200
+# Limite de semelhança (0-1) para aceitar nomes com erro de digitação; o padrão do pg_trgm (0.6) é rígido demais
+SIMILARITY_THRESHOLD = os.getenv("EMPLOYEE_SEARCH_SIMILARITY", "0.5")
+
+def _unaccent(expr):
+    # Wrapper IMMUTABLE de unaccent criado na migração (permite usar a expressão nos índices trigram)
+    return func.immutable_unaccent(expr)
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _encode_cursor(full_name: str, emp_id, rank: Optional[float] = None) -> str:
+    """Cursor opaco (base64) com a chave de ordenação do último item: (nome, id) e, em buscas, a relevância."""
+    raw = f"{emp_id}|{full_name}"
+    if rank is not None:
+        raw = f"{rank!r}|{raw}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str, with_rank: bool):
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 2 if with_rank else 1)
+        if with_rank:
+            return float(parts[0]), uuid.UUID(parts[1]), parts[2]
+        return None, uuid.UUID(parts[0]), parts[1]
+    except (ValueError, IndexError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+
+@router.get("", response_model=EmployeePage, response_class=ORJSONResponse)
 async def list_employees(
-    search: Optional[str] = Query(None),
+    search: Optional[str] = Query(None, max_length=100),
     status: Optional[str] = Query("active"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    query = db.query(Employee).join(User)
+    """
+    Diretório de colaboradores com paginação por cursor (keyset) sobre (nome, id).
+    A busca ignora acentos e maiúsculas (unaccent + pg_trgm): encontra trechos do nome ou do login
+    e também nomes parecidos (erros de digitação), ordenando pelos mais semelhantes.
+    Um único SELECT só com as colunas da resposta (sem hidratar Employee/User nem lazy load por linha).
+    """
+    query = select(
+        Employee.id,
+        User.username,
+        Employee.full_name,
+        Employee.department,
+        Employee.title,
+        User.is_active,
+        User.email,
+    ).select_from(Employee).join(User, User.id == Employee.user_id)
     
     if status == "active": 
-        query = query.filter(User.is_active == True)
+        query = query.where(User.is_active == True)
     elif status == "inactive": 
-        query = query.filter(User.is_active == False)
+        query = query.where(User.is_active == False)
     
+    search = (search or "").strip()
+    rank = None
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Employee.full_name.ilike(search_filter)) | 
-            (User.username.ilike(search_filter))
-        )
-
-    employees = query.order_by(Employee.full_name.asc()).all()
+        # Vale só para esta transação (o operador <% usa este limite e continua indexável)
+        db.execute(select(func.set_config("pg_trgm.word_similarity_threshold", SIMILARITY_THRESHOLD, True)))
+        term = _unaccent(literal(search))
+        name, login = _unaccent(Employee.full_name), _unaccent(User.username)
+        pattern = _unaccent(literal(_like_pattern(search)))
+        # Todas as condições são atendidas pelos índices GIN trigram (BitmapOr)
+        query = query.where(or_(
+            name.ilike(pattern, escape="\\"),
+            login.ilike(pattern, escape="\\"),
+            term.op("<%")(name),
+        ))
+        rank = cast(func.greatest(func.word_similarity(term, name), func.word_similarity(term, login)), Float)
+        query = query.add_columns(rank.label("rank"))
+
+    # Relevância decrescente vira "-rank" crescente para comparar a chave inteira como tupla
+    sort_key = ([-rank] if rank is not None else []) + [Employee.full_name, Employee.id]
+    if cursor:
+        cursor_rank, cursor_id, cursor_name = _decode_cursor(cursor, rank is not None)
+        cursor_key = ([-cursor_rank] if rank is not None else []) + [cursor_name, cursor_id]
+        query = query.where(tuple_(*sort_key) > tuple_(*cursor_key))
+
+    rows = db.execute(query.order_by(*sort_key).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.full_name, last.id, last.rank if rank is not None else None)
     
-    return [
-        {
-            "id": str(e.id),
-            "username": e.user.username,
-            "full_name": e.full_name,
-            "department": e.department,
-            "title": e.title,
-            "is_active": e.user.is_active,
-            "email": e.user.email
-        } for e in employees
-    ]
+    return {"items": [row._mapping for row in rows], "next_cursor": next_cursor}
+
+@router.get("/autocomplete", response_model=List[AutocompleteItem], response_class=ORJSONResponse)
+async def autocomplete_employees(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    token: dict = Depends(get_token_payload)
+):
+    """
+    Type-ahead de colaboradores ativos (menções, seleção de responsável, telas do RH).
+    Responde do índice em memória, sem tocar no banco (nem para autenticar).
+    """
+    return [entry._asdict() for entry in autocomplete.index.search(q, limit)]
 
 @router.get("/{username}")
 async def get_employee_detail(
@@ -98,7 +177,6 @@ async def update_employee_profile(
 
     emp = user.employee
     parse_date = lambda d: datetime.strptime(d, "%Y-%m-%d") if d else None
-    ad_synced = True
 
     # 🔴 CAMPOS RESTRITOS (Apenas DP/Admin)
     if is_hr:
@@ -113,7 +191,12 @@ async def update_employee_profile(
             meta = dict(emp.meta) if emp.meta else {}
             meta["depts"] = new_depts
             emp.meta = meta
-            ad_synced = ADService.set_user_groups(user.username, new_depts)
+            # Grupos do AD: gravados em segundo plano pelo worker do outbox (mesma transação que o banco)
+            ad_outbox.enqueue(db, user.username, new_depts)
+
+        # Setores mudaram: recalcula os avisos setoriais que este colaborador passa (ou deixa) de ver
+        if "department" in payload or "depts" in payload:
+            refresh_audience(db, user_ids=[user.id])
 
     # 🟢 CAMPOS LIVRES (A própria pessoa ou o RH editam)
     if is_self or is_hr:
@@ -126,61 +209,40 @@ async def update_employee_profile(
         emp.meta = meta
 
     db.commit()
+    await run_in_threadpool(autocomplete.index.refresh_users, [user.id])
+    if is_hr and "depts" in payload:
+        ad_outbox.kick()
 
-    if is_hr and not ad_synced:
-        return {"message": "Salvo localmente. O AD está offline."}
-        
     return {"message": "Perfil atualizado com sucesso."}
 
-@router.post("/sync")
+@router.post("/sync", status_code=202)
 async def sync_ad_to_db(
+    full: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    Enfileira a sincronização com o AD, que roda em segundo plano (acompanhe em GET /employees/sync/{job_id}).
+    Incremental (só o que mudou no AD desde a última execução); ?full=true força a releitura completa.
+    """
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Acesso Negado")
 
-    ad_users = ADService.list_all_users()
-    if not ad_users:
-        raise HTTPException(status_code=503, detail="Não foi possível conectar ao AD.")
+    job, created = sync_jobs.enqueue(db, full=full, trigger="manual", requested_by=current_user["id"])
+    message = "Sincronização iniciada." if created else "Já existe uma sincronização em andamento."
+    return {"message": message, **sync_jobs.job_to_dict(job)}
 
-    synced_count = 0
-    for ad_u in ad_users:
-        db_user = db.query(User).filter(User.username == ad_u["username"]).first()
-        
-        if not db_user:
-            db_user = User(
-                id=uuid.uuid4(),
-                username=ad_u["username"],
-                email=ad_u["email"],
-                role="user",
-                is_active=ad_u["is_active"]
-            )
-            db.add(db_user)
-            db.flush()
-            
-            emp = Employee(
-                id=uuid.uuid4(),
-                user_id=db_user.id,
-                full_name=ad_u["full_name"],
-                department=ad_u["primary_dept"],
-                title=ad_u["title"],
-                location="Matriz",
-                meta={"depts": ad_u["depts"]}
-            )
-            db.add(emp)
-        else:
-            db_user.is_active = ad_u["is_active"]
-            if db_user.employee:
-                db_user.employee.full_name = ad_u["full_name"]
-                db_user.employee.department = ad_u["primary_dept"]
-                db_user.employee.title = ad_u["title"]
-                
-                meta = dict(db_user.employee.meta) if db_user.employee.meta else {}
-                meta["depts"] = ad_u["depts"]
-                db_user.employee.meta = meta
-                
-        synced_count += 1
-    
-    db.commit()
-    return {"message": f"{synced_count} colaboradores sincronizados do AD."}
\ No newline at end of file
+@router.get("/sync/{job_id}")
+async def get_sync_job(
+    job_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Progresso, contagens e erro de uma sincronização com o AD."""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Acesso Negado")
+
+    job = db.get(DirectorySyncJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sincronização não encontrada.")
+    return sync_jobs.job_to_dict(job)
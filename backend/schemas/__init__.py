@@ -0,0 +1 @@
+# Modelos Pydantic de resposta da API (contratos tipados das rotas), separados por domínio
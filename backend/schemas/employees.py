@@ -0,0 +1,24 @@
+import uuid
+from typing import List, Optional
+from pydantic import BaseModel
+
+class EmployeeListItem(BaseModel):
+    """Linha do diretório de colaboradores (GET /employees)."""
+    id: uuid.UUID
+    username: str
+    full_name: str
+    department: Optional[str] = None
+    title: Optional[str] = None
+    is_active: Optional[bool] = None
+    email: Optional[str] = None
+
+class EmployeePage(BaseModel):
+    items: List[EmployeeListItem]
+    next_cursor: Optional[str] = None
+
+class AutocompleteItem(BaseModel):
+    """Sugestão do type-ahead (GET /employees/autocomplete)."""
+    id: uuid.UUID
+    username: str
+    full_name: str
+    department: Optional[str] = None
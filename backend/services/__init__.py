@@ -0,0 +1 @@
+# Serviços de domínio compartilhados entre rotas, workers e comandos do manage.py
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Optional, List
+from sqlalchemy import select, func, update, literal, exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models.announcements import Announcement, announcement_acknowledgments, announcement_audience
+from models.users import User, Employee
+from services import events
+
+def recount_ack_counts(db: Session, ann_id: Optional[str] = None) -> int:
+    """
+    Recalcula Announcement.ack_count a partir de announcement_acknowledgments.
+    Só reescreve as linhas divergentes. Retorna quantos avisos foram corrigidos.
+    """
+    acks = announcement_acknowledgments.c
+    real_count = select(func.count()).select_from(announcement_acknowledgments).where(
+        acks.announcement_id == Announcement.id
+    ).scalar_subquery()
+
+    stmt = update(Announcement).where(Announcement.ack_count != real_count).values(ack_count=real_count)
+    if ann_id:
+        stmt = stmt.where(Announcement.id == ann_id)
+
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    db.commit()
+    return result.rowcount
+
+def acknowledge(db: Session, user_id: str, ann_ids: List[str]) -> List[str]:
+    """
+    Registra a ciência do usuário em um ou mais avisos de forma idempotente.
+    Um único INSERT ... SELECT ... ON CONFLICT DO NOTHING grava só os pares novos e o contador
+    é incrementado apenas para eles, tudo na mesma transação. O SELECT passa pelo público
+    materializado do usuário e ignora avisos arquivados: IDs inexistentes, fora do público ou
+    arquivados não recebem ciência. Retorna os IDs que receberam ciência nova.
+    O novo total de cada aviso é publicado no canal do mural (entregue no commit).
+    """
+    if not ann_ids:
+        return []
+
+    acks = announcement_acknowledgments.c
+    aud = announcement_audience.c
+    new_rows = select(
+        aud.user_id,
+        Announcement.id,
+        Announcement.created_at,
+        literal(datetime.utcnow(), type_=acks.acknowledged_at.type),
+    ).select_from(announcement_audience) \
+     .join(Announcement, (Announcement.id == aud.announcement_id) & (Announcement.created_at == aud.announcement_created_at)) \
+     .where(aud.user_id == user_id, aud.announcement_id.in_(ann_ids), Announcement.is_archived == False)
+
+    stmt = pg_insert(announcement_acknowledgments).from_select(
+        ["user_id", "announcement_id", "announcement_created_at", "acknowledged_at"], new_rows
+    ).on_conflict_do_nothing().returning(acks.announcement_id)
+
+    inserted = [row.announcement_id for row in db.execute(stmt)]
+    if inserted:
+        updated = db.execute(
+            update(Announcement)
+            .where(Announcement.id.in_(inserted))
+            .values(ack_count=Announcement.ack_count + 1)
+            .returning(Announcement.id, Announcement.ack_count, Announcement.category, Announcement.target_dept)
+            .execution_options(synchronize_session=False)
+        )
+        for row in updated:
+            events.publish(db, "ack_count", {
+                "id": str(row.id), "ack_count": row.ack_count,
+                "category": row.category, "target_dept": row.target_dept,
+            })
+    db.commit()
+    return [str(i) for i in inserted]
+
+def acknowledged_users_query(ann: Announcement):
+    """
+    SELECT (só as colunas usadas) de quem deu ciência no aviso, via índice (announcement_id, acknowledged_at).
+    A data de publicação restringe a leitura a uma única partição.
+    """
+    acks = announcement_acknowledgments.c
+    return select(
+        User.username,
+        func.coalesce(Employee.full_name, User.username).label("name"),
+        func.coalesce(Employee.department, "N/A").label("dept"),
+        acks.acknowledged_at,
+    ).select_from(announcement_acknowledgments) \
+     .join(User, User.id == acks.user_id) \
+     .outerjoin(Employee, Employee.user_id == User.id) \
+     .where(acks.announcement_id == ann.id, acks.announcement_created_at == ann.created_at)
+
+def pending_users_query(ann: Announcement):
+    """SELECT dos usuários ativos do público materializado do aviso sem ciência (join pela PK do público + NOT EXISTS)."""
+    acks = announcement_acknowledgments.c
+    aud = announcement_audience.c
+    return select(
+        User.username,
+        func.coalesce(Employee.full_name, User.username).label("name"),
+        func.coalesce(Employee.department, "N/A").label("dept"),
+    ).select_from(announcement_audience) \
+     .join(User, User.id == aud.user_id) \
+     .join(Employee, Employee.user_id == User.id) \
+     .where(aud.announcement_id == ann.id, aud.announcement_created_at == ann.created_at, User.is_active == True) \
+     .where(~exists().where(
+         acks.user_id == User.id, acks.announcement_id == ann.id, acks.announcement_created_at == ann.created_at
+     ))
+
+def count_pending(db: Session, ann: Announcement) -> int:
+    return db.execute(
+        select(func.count()).select_from(pending_users_query(ann).subquery())
+    ).scalar_one()
@@ -0,0 +1,162 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from ldap3.core.exceptions import LDAPCommunicationError, LDAPSocketOpenError
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from auth.ad_service import ADService
+from auth.ldap_pool import LDAPPoolExhausted
+from database import SessionLocal
+from models.sync import ADGroupOutbox
+
+# Quantos usuários o worker manda ao AD por rodada
+OUTBOX_BATCH_SIZE = int(os.getenv("AD_OUTBOX_BATCH_SIZE", "50"))
+# Varredura periódica (retentativas com backoff e edições gravadas por outros processos)
+OUTBOX_POLL_SECONDS = float(os.getenv("AD_OUTBOX_POLL_SECONDS", "30"))
+# Backoff exponencial: base * 2^tentativas, limitado ao máximo
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("AD_OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("AD_OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+# Depois disso a linha fica parada (com last_error) até `manage.py ad-outbox --retry-failed`
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("AD_OUTBOX_MAX_ATTEMPTS", "20"))
+# Reserva de uma linha pega por um worker: se o processo morrer, outro retoma depois disso
+OUTBOX_LEASE_SECONDS = 300
+
+# AD fora do ar: não adianta tentar o resto do lote agora
+_AD_UNAVAILABLE = (LDAPCommunicationError, LDAPSocketOpenError, LDAPPoolExhausted)
+
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+def enqueue(db: Session, username: str, depts: List[str]) -> None:
+    """
+    Registra os setores desejados do usuário para gravar no AD. Não comita: entra na mesma
+    transação da alteração de Employee.meta["depts"]. Edições pendentes do mesmo usuário se fundem
+    (fica só a mais recente) e a contagem de tentativas recomeça.
+    """
+    now = datetime.utcnow()
+    stmt = pg_insert(ADGroupOutbox).values(
+        username=username, depts=depts, version=1, attempts=0,
+        next_attempt_at=now, created_at=now, updated_at=now,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ADGroupOutbox.username],
+        set_={
+            "depts": stmt.excluded.depts,
+            "version": ADGroupOutbox.version + 1,
+            "attempts": 0,
+            "next_attempt_at": stmt.excluded.next_attempt_at,
+            "last_error": None,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+def pending_usernames(db: Session) -> Set[str]:
+    """Logins com grupos ainda não gravados no AD (o banco tem a versão mais nova)."""
+    return set(db.execute(select(ADGroupOutbox.username)).scalars())
+
+def is_pending(db: Session, username: str) -> bool:
+    return db.get(ADGroupOutbox, username) is not None
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_BACKOFF_SECONDS * 2 ** attempts, OUTBOX_MAX_BACKOFF_SECONDS))
+
+def _claim(db: Session, limit: int) -> List:
+    """Reserva as próximas linhas vencidas (SKIP LOCKED: vários processos dividem a fila sem se bloquear)."""
+    now = datetime.utcnow()
+    due = select(ADGroupOutbox.username).where(
+        ADGroupOutbox.next_attempt_at <= now, ADGroupOutbox.attempts < OUTBOX_MAX_ATTEMPTS,
+    ).order_by(ADGroupOutbox.next_attempt_at).limit(limit).with_for_update(skip_locked=True)
+    rows = db.execute(
+        update(ADGroupOutbox).where(ADGroupOutbox.username.in_(due.scalar_subquery()))
+        .values(next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+        .returning(ADGroupOutbox.username, ADGroupOutbox.depts, ADGroupOutbox.version, ADGroupOutbox.attempts)
+    ).all()
+    db.commit()
+    return rows
+
+def _done(db: Session, row) -> None:
+    # Só apaga se ninguém editou de novo enquanto o AD era gravado (senão a nova versão segue na fila)
+    db.execute(delete(ADGroupOutbox).where(
+        ADGroupOutbox.username == row.username, ADGroupOutbox.version == row.version,
+    ))
+
+def _failed(db: Session, row, error: Exception) -> None:
+    db.execute(update(ADGroupOutbox).where(
+        ADGroupOutbox.username == row.username, ADGroupOutbox.version == row.version,
+    ).values(
+        attempts=ADGroupOutbox.attempts + 1,
+        next_attempt_at=datetime.utcnow() + _backoff(row.attempts),
+        last_error=str(error) or error.__class__.__name__,
+    ))
+
+def process_batch(limit: int = OUTBOX_BATCH_SIZE) -> Dict:
+    """Grava no AD um lote de usuários pendentes. Retorna as contagens sent/failed."""
+    stats = {"sent": 0, "failed": 0}
+    db = SessionLocal()
+    try:
+        rows = _claim(db, limit)
+        for i, row in enumerate(rows):
+            try:
+                ADService.set_user_groups(row.username, row.depts)
+            except _AD_UNAVAILABLE as e:
+                # Devolve o restante do lote com backoff em vez de esperar o timeout usuário a usuário
+                for pending in rows[i:]:
+                    _failed(db, pending, e)
+                stats["failed"] += len(rows) - i
+                print(f"❌ AD indisponível; {len(rows) - i} alteração(ões) de grupo adiada(s): {e}")
+                break
+            except Exception as e:
+                _failed(db, row, e)
+                stats["failed"] += 1
+                print(f"❌ Erro ao gravar os grupos de {row.username} no AD: {e}")
+            else:
+                _done(db, row)
+                stats["sent"] += 1
+            db.commit()
+        db.commit()
+        return stats
+    finally:
+        db.close()
+
+def drain() -> Dict:
+    """Processa lotes até não sobrar nada vencido."""
+    total = {"sent": 0, "failed": 0}
+    while True:
+        stats = process_batch()
+        total = {k: total[k] + stats[k] for k in total}
+        if stats["failed"] or sum(stats.values()) < OUTBOX_BATCH_SIZE:
+            return total
+
+def retry_failed(db: Session) -> int:
+    """Devolve à fila as linhas que esgotaram as tentativas. Retorna quantas."""
+    count = db.execute(
+        update(ADGroupOutbox).where(ADGroupOutbox.attempts >= OUTBOX_MAX_ATTEMPTS)
+        .values(attempts=0, next_attempt_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return count
+
+def _worker_loop() -> None:
+    while True:
+        _wake.clear()
+        try:
+            drain()
+        except Exception as e:
+            print(f"❌ Erro no worker de grupos do AD: {e}")
+        _wake.wait(OUTBOX_POLL_SECONDS)
+
+def kick() -> None:
+    """Acorda o worker do outbox deste processo (uma thread por processo)."""
+    global _worker
+    with _worker_lock:
+        _wake.set()
+        if _worker is None:
+            _worker = threading.Thread(target=_worker_loop, name="ad-outbox-worker", daemon=True)
+            _worker.start()
+
+def start() -> None:
+    """Startup: retoma o que ficou pendente e passa a varrer a fila periodicamente."""
+    kick()
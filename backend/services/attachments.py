@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlalchemy import select, func, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models.announcements import Announcement
+from models.attachments import AttachmentBlob
+from services.storage import get_storage, blob_key
+from services.thumbnails import thumbnail_key
+
+def add_reference(db: Session, stored: Dict) -> str:
+    """
+    Registra (ou reaproveita) o blob de um upload e soma uma referência, na transação do aviso.
+    Não faz commit: quem chama grava o aviso e comita junto. Retorna a chave do blob.
+    """
+    key = blob_key(stored["sha256"], stored["filename"])
+    now = datetime.utcnow()
+    stmt = pg_insert(AttachmentBlob).values(
+        key=key, sha256=stored["sha256"], size=stored["size"],
+        ref_count=1, created_at=now, last_referenced_at=now
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[AttachmentBlob.key],
+        set_={"ref_count": AttachmentBlob.ref_count + 1, "last_referenced_at": now}
+    ))
+    return key
+
+def materialize(stored: Dict, key: str) -> None:
+    """
+    Depois do commit da referência: coloca o arquivo no storage se ele ainda não existe
+    (deduplicação) ou descarta a cópia temporária. Bloqueante: chamar via run_in_threadpool.
+    """
+    storage = get_storage()
+    if storage.exists(key):
+        os.remove(stored["path"])
+    else:
+        storage.put(stored["path"], key)
+
+def recount_references(db: Session) -> int:
+    """Recalcula ref_count a partir de announcements.attachment_key. Retorna quantos foram corrigidos."""
+    real_count = select(func.count()).select_from(Announcement).where(
+        Announcement.attachment_key == AttachmentBlob.key
+    ).scalar_subquery()
+    result = db.execute(
+        update(AttachmentBlob).where(AttachmentBlob.ref_count != real_count)
+        .values(ref_count=real_count)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+def collect_garbage(db: Session, grace_hours: int = 24) -> Dict[str, int]:
+    """
+    Remove blobs sem referência há mais de `grace_hours` e arquivos do storage sem registro.
+    A carência protege uploads em andamento (arquivo gravado logo após o commit do aviso).
+    """
+    storage = get_storage()
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    stats = {"recounted": recount_references(db), "blobs_removed": 0, "orphans_removed": 0}
+
+    candidates = db.execute(
+        select(AttachmentBlob.key).where(AttachmentBlob.ref_count == 0, AttachmentBlob.last_referenced_at < cutoff)
+    ).scalars().all()
+    for key in candidates:
+        # DELETE condicional segura o lock da linha até o commit: um upload concorrente que
+        # reaproveite o blob espera, e depois recria o registro e o arquivo
+        deleted = db.execute(
+            delete(AttachmentBlob)
+            .where(AttachmentBlob.key == key, AttachmentBlob.ref_count == 0, AttachmentBlob.last_referenced_at < cutoff)
+            .returning(AttachmentBlob.key, AttachmentBlob.thumbnail_key)
+        ).first()
+        if deleted:
+            storage.delete(key)
+            if deleted.thumbnail_key:
+                storage.delete(deleted.thumbnail_key)
+            stats["blobs_removed"] += 1
+        db.commit()
+
+    # Arquivos sem linha em attachment_blobs (ex.: falha entre o upload e o commit)
+    # (a miniatura de um blob registrado também conta como conhecida, mesmo se ainda sendo gerada)
+    known = set()
+    for key in db.execute(select(AttachmentBlob.key)).scalars():
+        known.update([key, thumbnail_key(key)])
+    cutoff_ts = time.time() - grace_hours * 3600
+    for key, mtime in storage.iter_keys():
+        if key not in known and mtime < cutoff_ts:
+            storage.delete(key)
+            stats["orphans_removed"] += 1
+    return stats
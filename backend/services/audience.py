@@ -0,0 +1,93 @@
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select, delete, exists, or_, and_, cast, literal
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.orm import Session
+from models.announcements import Announcement, announcement_audience
+from models.users import User, Employee
+
+# Categorias que todo colaborador ativo vê e papéis que recebem os avisos de gestão
+PUBLIC_CATEGORIES = ["GENERAL", "TECH"]
+MANAGEMENT_ROLES = ["admin", "diretoria", "coordenador", "supervisor"]
+
+# Cache por worker do contador de não lidos (GET /announcements/unread-count): {id do usuário: (expira_em, resposta)}.
+# Fica junto do público porque quem o altera precisa invalidar o contador dos usuários afetados;
+# mudanças gravadas por outros processos aparecem quando a entrada expira.
+unread_cache: Dict[str, tuple] = {}
+
+def forget_unread(user_ids: Optional[Iterable] = None) -> None:
+    """Descarta o contador em cache dos usuários informados (sem filtro: de todos)."""
+    if user_ids is None:
+        unread_cache.clear()
+        return
+    for user_id in user_ids:
+        unread_cache.pop(str(user_id), None)
+
+def _audience_rule():
+    """
+    Regra de visibilidade em SQL sobre (Announcement, User, Employee): a mesma do mural,
+    mas com os setores gravados no colaborador (meta.depts ou setor principal) e comparação exata.
+    """
+    return or_(
+        Announcement.category.in_(PUBLIC_CATEGORIES),
+        and_(Announcement.category == "OPS_MGMT", User.role.in_(MANAGEMENT_ROLES)),
+        and_(
+            Announcement.category == "SECTOR",
+            or_(
+                Employee.department == Announcement.target_dept,
+                cast(Employee.meta, JSONB)["depts"].has_key(Announcement.target_dept),
+            ),
+        ),
+    )
+
+def refresh_audience(
+    db: Session,
+    ann_ids: Optional[Iterable] = None,
+    user_ids: Optional[Iterable] = None,
+) -> int:
+    """
+    Recalcula announcement_audience para os avisos e/ou usuários informados (sem filtro: tudo).
+    Apaga as linhas do escopo e regrava com um único INSERT ... SELECT, na transação de quem chama
+    (não faz commit). Retorna quantas linhas de público foram gravadas.
+    """
+    ann_ids = list(ann_ids) if ann_ids is not None else None
+    user_ids = list(user_ids) if user_ids is not None else None
+    if ann_ids == [] or user_ids == []:
+        return 0
+
+    # A sessão não usa autoflush: envia antes as mudanças pendentes (setores, usuários novos)
+    db.flush()
+    aud = announcement_audience.c
+    stmt = delete(announcement_audience)
+    if ann_ids is not None:
+        stmt = stmt.where(aud.announcement_id.in_(ann_ids))
+    if user_ids is not None:
+        stmt = stmt.where(aud.user_id.in_(user_ids))
+    db.execute(stmt)
+
+    rows = select(Announcement.id, User.id, Announcement.created_at) \
+        .select_from(Announcement) \
+        .join(User, literal(True)) \
+        .outerjoin(Employee, Employee.user_id == User.id) \
+        .where(User.is_active == True, _audience_rule())
+    if ann_ids is not None:
+        rows = rows.where(Announcement.id.in_(ann_ids))
+    if user_ids is not None:
+        rows = rows.where(User.id.in_(user_ids))
+
+    result = db.execute(
+        pg_insert(announcement_audience)
+        .from_select(["announcement_id", "user_id", "announcement_created_at"], rows)
+        .on_conflict_do_nothing()
+    )
+    # Escopo por aviso muda o contador de qualquer um do público: descarta tudo
+    forget_unread(user_ids if ann_ids is None else None)
+    return result.rowcount
+
+def audience_filter(user_id):
+    """Predicado SQL: o aviso (Announcement) está no público do usuário. Resolvido pelo índice (user_id, announcement_id)."""
+    aud = announcement_audience.c
+    return exists().where(
+        aud.user_id == user_id,
+        aud.announcement_id == Announcement.id,
+        aud.announcement_created_at == Announcement.created_at,
+    )
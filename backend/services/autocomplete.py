@@ -0,0 +1,161 @@
+import os
+import time
+import heapq
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+from sqlalchemy import select
+from database import SessionLocal
+from models.users import User, Employee
+
+# Índice em memória (por worker) para type-ahead de colaboradores ativos: cada palavra do nome,
+# o login e o setor entram por prefixo. Prefixos são limitados em tamanho, então a memória cresce
+# linearmente com o número de colaboradores, nunca com o tamanho dos nomes.
+MAX_PREFIX_LEN = 8
+MAX_QUERY_TERMS = 4
+# Outros workers só enxergam mudanças feitas aqui na próxima reconstrução
+REFRESH_SECONDS = int(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "300"))
+
+class Entry(NamedTuple):
+    id: str
+    username: str
+    full_name: str
+    department: Optional[str]
+    sort_key: str
+    tokens: tuple
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos ("João" -> "joao")."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+def _tokens(*values) -> tuple:
+    tokens = set()
+    for value in values:
+        norm = normalize(value)
+        tokens.update(norm.replace(".", " ").replace("_", " ").replace("-", " ").split())
+        if value and " " not in value:
+            tokens.add(norm)  # Login inteiro ("joao.silva") também casa
+    return tuple(tokens)
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._entries: Dict[str, Entry] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._built_at = 0.0
+        # Uma reconstrução por vez; também serializa as atualizações incrementais com a troca do índice
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def _add(self, entry: Entry):
+        self._entries[entry.id] = entry
+        for token in entry.tokens:
+            for size in range(1, min(len(token), MAX_PREFIX_LEN) + 1):
+                self._postings.setdefault(token[:size], set()).add(entry.id)
+
+    def _remove(self, emp_id: str):
+        entry = self._entries.pop(emp_id, None)
+        if not entry:
+            return
+        for token in entry.tokens:
+            for size in range(1, min(len(token), MAX_PREFIX_LEN) + 1):
+                posting = self._postings.get(token[:size])
+                if posting is not None:
+                    posting.discard(emp_id)
+                    if not posting:
+                        del self._postings[token[:size]]
+
+    @staticmethod
+    def _load(user_ids: Optional[Iterable] = None) -> List[tuple]:
+        db = SessionLocal()
+        try:
+            query = select(Employee.id, User.id, User.username, Employee.full_name, Employee.department, User.is_active) \
+                .select_from(Employee).join(User, User.id == Employee.user_id)
+            if user_ids is not None:
+                query = query.where(User.id.in_(list(user_ids)))
+            else:
+                query = query.where(User.is_active == True)
+            return db.execute(query).all()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _entry(row) -> Entry:
+        return Entry(
+            id=str(row[0]), username=row.username, full_name=row.full_name, department=row.department,
+            sort_key=normalize(row.full_name), tokens=_tokens(row.full_name, row.username, row.department),
+        )
+
+    def rebuild(self) -> int:
+        """Recarrega todos os colaboradores ativos (uma consulta) e troca o índice de uma vez."""
+        with self._lock:
+            try:
+                fresh = AutocompleteIndex()
+                for row in self._load():
+                    fresh._add(self._entry(row))
+                self._entries, self._postings = fresh._entries, fresh._postings
+                self._built_at = time.monotonic()
+                return len(self._entries)
+            finally:
+                self._rebuilding = False
+
+    def refresh_users(self, user_ids: Iterable) -> None:
+        """
+        Atualização incremental: relê só os usuários informados (inativos saem do índice).
+        Bloqueante (consulta o banco): chamar fora do event loop. Se uma reconstrução estiver em curso,
+        espera a troca do índice e aplica por cima, para a alteração não se perder no snapshot antigo.
+        """
+        rows = self._load(user_ids)
+        with self._lock:
+            for row in rows:
+                self._remove(str(row[0]))
+                if row.is_active:
+                    self._add(self._entry(row))
+
+    def _refresh_if_stale(self):
+        if self._rebuilding or time.monotonic() - self._built_at < REFRESH_SECONDS:
+            return
+        self._rebuilding = True
+        threading.Thread(target=self._safe_rebuild, name="autocomplete-rebuild", daemon=True).start()
+
+    def _safe_rebuild(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            print(f"❌ Erro ao reconstruir o índice de autocomplete: {e}")
+
+    def search(self, q: str, limit: int = 10) -> List[Entry]:
+        """
+        Colaboradores cujas palavras (nome, login, setor) começam com cada termo digitado.
+        Nomes que começam pela busca vêm primeiro; depois ordem alfabética.
+        """
+        self._refresh_if_stale()
+        query = normalize(q).strip()
+        terms = query.split()[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+
+        postings = []
+        for term in terms:
+            posting = self._postings.get(term[:MAX_PREFIX_LEN])
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        # Sempre uma cópia: a atualização incremental pode alterar os conjuntos do índice durante a busca
+        candidates = postings[0].intersection(*postings[1:]) if len(postings) > 1 else set(postings[0])
+
+        # Um único .get() por candidato: quem saiu do índice durante a busca é simplesmente ignorado
+        entries = self._entries
+        found = [e for e in map(entries.get, candidates) if e is not None]
+        long_terms = [t for t in terms if len(t) > MAX_PREFIX_LEN]
+        if long_terms:
+            # O índice só guarda prefixos curtos: confirma os termos longos nas palavras da entrada
+            found = [e for e in found if all(any(tok.startswith(t) for tok in e.tokens) for t in long_terms)]
+
+        return heapq.nsmallest(
+            limit, found,
+            key=lambda e: (not e.sort_key.startswith(query), e.sort_key),
+        )
+
+index = AutocompleteIndex()
@@ -0,0 +1,94 @@
+import os
+import re
+import mimetypes
+from typing import Callable, BinaryIO, Optional, Tuple
+from urllib.parse import quote
+from fastapi import Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# Se definido (ex.: "/protected-attachments/"), o Python só responde os cabeçalhos e o
+# proxy da frente (nginx) entrega o arquivo via X-Accel-Redirect, com sendfile e Range nativos
+ACCEL_REDIRECT_PREFIX = os.getenv("ATTACHMENT_ACCEL_REDIRECT_PREFIX")
+
+# Privado: o conteúdo exige login. Imutável: a URL aponta sempre para o mesmo conteúdo.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Interpreta um Range de intervalo único. Retorna (início, fim inclusivo) ou None para ignorar."""
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # Múltiplos intervalos/unidades desconhecidas: responde o arquivo inteiro
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def _iter_file(opener: Callable[[], BinaryIO], start: int, length: int):
+    async def generate():
+        f = await run_in_threadpool(opener)
+        try:
+            await run_in_threadpool(f.seek, start)
+            remaining = length
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            await run_in_threadpool(f.close)
+    return generate()
+
+def file_response(
+    request: Request,
+    opener: Callable[[], BinaryIO],
+    size: int,
+    etag: str,
+    filename: str,
+    accel_path: Optional[str] = None,
+    inline: bool = False,
+) -> Response:
+    """
+    Resposta de download com ETag/If-None-Match (304), Range (206/416) e cache imutável.
+    Com ATTACHMENT_ACCEL_REDIRECT_PREFIX configurado, delega a entrega ao proxy.
+    """
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"{'inline' if inline else 'attachment'}; filename*=UTF-8''{quote(filename or 'anexo')}",
+    }
+    media_type = mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if ACCEL_REDIRECT_PREFIX and accel_path:
+        headers["X-Accel-Redirect"] = ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(accel_path)
+        return Response(headers=headers, media_type=media_type)
+
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    # If-Range: só atende o intervalo se o cliente ainda tiver a mesma versão
+    if range_header and size > 0 and request.headers.get("if-range", etag) == etag:
+        parsed = _parse_range(range_header, size)
+        if parsed:
+            start, end = parsed
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(end - start + 1, 0)
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(_iter_file(opener, start, length), status_code=status_code, headers=headers, media_type=media_type)
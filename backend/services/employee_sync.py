@@ -0,0 +1,283 @@
+import os
+import uuid
+from datetime import datetime
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+from ldap3.core.exceptions import LDAPException
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from auth.ad_service import ADService, AD_PAGE_SIZE
+from models.users import User, Employee
+from models.sync import DirectorySyncState
+from services import ad_outbox
+from services.audience import refresh_audience
+
+SYNC_BATCH_SIZE = int(os.getenv("EMPLOYEE_SYNC_BATCH_SIZE", "500"))
+SYNC_SOURCE = "ad_users"
+
+def _load_snapshot(db: Session) -> Dict[str, Dict]:
+    """Uma única leitura de users + employees, indexada por login."""
+    rows = db.execute(
+        select(
+            User.id.label("user_id"), User.username, User.is_active,
+            Employee.id.label("employee_id"), Employee.full_name, Employee.department, Employee.title, Employee.meta,
+        ).select_from(User).outerjoin(Employee, Employee.user_id == User.id)
+    ).all()
+    return {row.username: row._asdict() for row in rows}
+
+def _user_row(user_id, username: str, email: Optional[str], is_active: bool) -> Dict:
+    # INSERT multi-VALUES exige as mesmas colunas em todas as linhas do lote.
+    # Em usuários existentes o conflito só atualiza is_active (email/role ficam como estão).
+    return {"id": user_id, "username": username, "email": email, "role": "user", "is_active": is_active}
+
+def _diff(current: Dict, ad_u: Dict):
+    """Compara o registro do banco com o do AD. Retorna (linha de users, linha de employees) só com o que mudou."""
+    user_row = None
+    if current["is_active"] != ad_u["is_active"]:
+        user_row = _user_row(current["user_id"], ad_u["username"], None, ad_u["is_active"])
+
+    meta = dict(current["meta"] or {})
+    employee_changed = current["employee_id"] is None or (
+        current["full_name"] != ad_u["full_name"]
+        or current["department"] != ad_u["primary_dept"]
+        or current["title"] != ad_u["title"]
+        or sorted(meta.get("depts") or []) != sorted(ad_u["depts"])
+    )
+    employee_row = None
+    if employee_changed:
+        meta["depts"] = ad_u["depts"]
+        employee_row = {
+            "id": current["employee_id"] or uuid.uuid4(),
+            "user_id": current["user_id"],
+            "full_name": ad_u["full_name"],
+            "department": ad_u["primary_dept"],
+            "title": ad_u["title"],
+            "location": "Matriz",
+            "meta": meta,
+        }
+    return user_row, employee_row
+
+def _drop_taken_emails(db: Session, users: List[Dict]) -> List[str]:
+    """
+    users.email é UNIQUE e o upsert só resolve conflito de login: e-mail de conta nova que já pertence
+    a outro login (ou repetido no próprio lote) entra vazio em vez de derrubar o lote. Retorna os logins afetados.
+    """
+    emails = [row["email"] for row in users if row["email"]]
+    if not emails:
+        return []
+    owners = dict(db.execute(select(User.email, User.username).where(User.email.in_(emails))).all())
+    dropped = []
+    for row in users:
+        email = row["email"]
+        if not email:
+            continue
+        if owners.setdefault(email, row["username"]) != row["username"]:
+            row["email"] = None
+            dropped.append(row["username"])
+    return dropped
+
+def _apply_batch(
+    db: Session, users: List[Dict], employees: List[Dict], audience_user_ids: List, email_conflicts: List[str],
+) -> Dict:
+    """
+    Grava um lote com um INSERT ... ON CONFLICT DO UPDATE por tabela e comita.
+    Logins cujo e-mail já era de outra conta vão para `email_conflicts` (gravados sem e-mail).
+    Retorna {id gerado: id real} dos novos usuários que já tinham sido criados por outro caminho (login).
+    """
+    remap = {}
+    if users:
+        email_conflicts.extend(_drop_taken_emails(db, users))
+        stmt = pg_insert(User).values(users)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[User.username],
+            set_={"is_active": stmt.excluded.is_active},
+            where=User.is_active.is_distinct_from(stmt.excluded.is_active),
+        ))
+        # O login pode ter criado o usuário depois da leitura do snapshot: o upsert manteve o id existente,
+        # então os employees (e o público dos avisos) têm que apontar para ele, não para o uuid gerado aqui
+        ids = dict(db.execute(
+            select(User.username, User.id).where(User.username.in_([row["username"] for row in users]))
+        ).all())
+        remap = {row["id"]: ids[row["username"]] for row in users if ids[row["username"]] != row["id"]}
+        if remap:
+            employees = [{**row, "user_id": remap.get(row["user_id"], row["user_id"])} for row in employees]
+            audience_user_ids = [remap.get(i, i) for i in audience_user_ids]
+    if employees:
+        stmt = pg_insert(Employee).values(employees)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[Employee.user_id],
+            set_={
+                "full_name": stmt.excluded.full_name,
+                "department": stmt.excluded.department,
+                "title": stmt.excluded.title,
+                "meta": stmt.excluded.meta,
+            },
+        ))
+    # Setores/status mudaram: recalcula o público dos avisos desses usuários no mesmo lote
+    refresh_audience(db, user_ids=audience_user_ids)
+    db.commit()
+    return remap
+
+def _remap_ids(user_ids: List, remap: Dict) -> None:
+    if remap:
+        user_ids[:] = [remap.get(i, i) for i in user_ids]
+
+def sync_employees(
+    db: Session,
+    ad_users: Iterable[Dict],
+    removed: Iterable[str] = (),
+    batch_size: int = SYNC_BATCH_SIZE,
+    snapshot: Optional[Dict[str, Dict]] = None,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+    pending: Set[str] = frozenset(),
+) -> Dict:
+    """
+    Sincroniza o snapshot do AD com users/employees.
+    Lê o banco uma vez, grava só as linhas com campos alterados em lotes (upsert) e comita a cada
+    `batch_size` colaboradores alterados, sem segurar locks durante toda a sincronização.
+    `removed`: logins que não existem mais no AD (são desativados).
+    `on_progress` recebe as contagens parciais a cada lote gravado e a cada `batch_size` colaboradores lidos.
+    `pending`: logins com alteração de setores ainda na fila do AD (ad_group_outbox); o banco está à frente
+    do AD, então para eles os setores do banco prevalecem.
+    Retorna as contagens created/updated/deactivated/unchanged, os IDs de usuários alterados e os logins
+    criados sem e-mail porque o endereço já era de outra conta (email_conflicts).
+    """
+    if snapshot is None:
+        snapshot = _load_snapshot(db)
+    stats = {"created": 0, "updated": 0, "deactivated": 0, "unchanged": 0}
+    changed_user_ids, email_conflicts = [], []
+    users, employees, audience_ids = [], [], []
+
+    for ad_u in ad_users:
+        if on_progress and sum(stats.values()) % batch_size == 0:
+            on_progress(dict(stats))
+        current = snapshot.get(ad_u["username"])
+        if current is not None and ad_u["username"] in pending:
+            meta = current["meta"] or {}
+            ad_u = {**ad_u, "depts": meta.get("depts", ad_u["depts"]), "primary_dept": current["department"]}
+        if current is None:
+            user_id = uuid.uuid4()
+            # Novos usuários entram com todas as colunas; se o login criou o mesmo usuário no meio da
+            # sincronização, o upsert mantém o existente e _apply_batch troca este id pelo real
+            users.append(_user_row(user_id, ad_u["username"], ad_u["email"], ad_u["is_active"]))
+            current = {"user_id": user_id, "is_active": ad_u["is_active"], "employee_id": None, "meta": {}}
+            _, employee_row = _diff(current, ad_u)
+            stats["created"] += 1
+        else:
+            user_row, employee_row = _diff(current, ad_u)
+            if user_row is None and employee_row is None:
+                stats["unchanged"] += 1
+                continue
+            if user_row:
+                users.append(user_row)
+            stats["deactivated" if current["is_active"] and not ad_u["is_active"] else "updated"] += 1
+
+        if employee_row:
+            employees.append(employee_row)
+        changed_user_ids.append(current["user_id"])
+        audience_ids.append(current["user_id"])
+
+        if len(audience_ids) >= batch_size:
+            _remap_ids(changed_user_ids, _apply_batch(db, users, employees, audience_ids, email_conflicts))
+            users, employees, audience_ids = [], [], []
+            if on_progress:
+                on_progress(dict(stats))
+
+    for username in removed:
+        current = snapshot.get(username)
+        if not current or not current["is_active"]:
+            continue
+        users.append(_user_row(current["user_id"], username, None, False))
+        stats["deactivated"] += 1
+        changed_user_ids.append(current["user_id"])
+        audience_ids.append(current["user_id"])
+
+        if len(audience_ids) >= batch_size:
+            _remap_ids(changed_user_ids, _apply_batch(db, users, employees, audience_ids, email_conflicts))
+            users, employees, audience_ids = [], [], []
+            if on_progress:
+                on_progress(dict(stats))
+
+    if audience_ids:
+        _remap_ids(changed_user_ids, _apply_batch(db, users, employees, audience_ids, email_conflicts))
+    if on_progress:
+        on_progress(dict(stats))
+    if email_conflicts:
+        print(f"⚠️ {len(email_conflicts)} conta(s) do AD com e-mail já usado por outro login, gravada(s) sem e-mail: {', '.join(email_conflicts[:20])}")
+    return {**stats, "changed_user_ids": changed_user_ids, "email_conflicts": email_conflicts}
+
+def _unique(ad_users: Iterable[Dict], seen: Set[str]) -> Iterator[Dict]:
+    """Descarta repetidos (ex.: usuário alterado e também membro de um grupo alterado) e registra quem veio do AD."""
+    for ad_u in ad_users:
+        if ad_u["username"] not in seen:
+            seen.add(ad_u["username"])
+            yield ad_u
+
+def _former_members(conn, snapshot: Dict[str, Dict], depts: Set[str], seen: Set[str], page_size: int) -> Iterator[Dict]:
+    # Ex-membros dos grupos alterados: o uSNChanged deles não muda, então são relidos pelo login.
+    # Gerador: só roda depois que os alterados/membros atuais já passaram (e estão em `seen`).
+    stale = [
+        username for username, current in snapshot.items()
+        if username not in seen and depts.intersection((current["meta"] or {}).get("depts") or [])
+    ]
+    if stale:
+        yield from ADService.iter_users_by_name(stale, conn, page_size)
+
+def run_sync(
+    db: Session,
+    full: bool = False,
+    page_size: int = AD_PAGE_SIZE,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+) -> Optional[Dict]:
+    """
+    Sincronização com o AD. Incremental por padrão: só lê do AD os objetos com uSNChanged acima da
+    marca gravada em directory_sync_state; sem marca, com `full=True` ou se o DC mudou, lê tudo.
+    O AD é lido em páginas (`page_size`) e cada página segue direto para os upserts em lote,
+    sem montar a lista do diretório em memória.
+    Contas excluídas (ou movidas para fora da base) são desativadas nos dois modos.
+    A marca só avança depois de todos os lotes gravados: uma execução interrompida é refeita na próxima.
+    Retorna None se o AD estiver inacessível.
+    """
+    state = db.get(DirectorySyncState, SYNC_SOURCE)
+    snapshot = _load_snapshot(db)
+    pending = ad_outbox.pending_usernames(db)
+    seen: Set[str] = set()
+    try:
+        with ADService._get_conn() as conn:
+            marker = ADService.sync_marker(conn)
+            full = full or state is None or state.usn is None or state.dc != marker["dc"]
+            if full:
+                ad_users = ADService.iter_users(page_size, conn=conn)
+                # Avaliado só depois que todo o AD passou (sync_employees percorre `removed` por último).
+                # Diretório vazio é tratado como falha: ninguém é desativado.
+                removed = (username for username in snapshot if seen and username not in seen)
+            else:
+                existing = ADService.list_usernames(conn, page_size)
+                if not existing:
+                    return None
+                removed = [username for username in snapshot if username not in existing]
+                groups = ADService.changed_groups(conn, state.usn, page_size)
+                ad_users = chain(
+                    ADService.iter_changed_users(conn, state.usn, list(groups), page_size),
+                    _former_members(conn, snapshot, set(groups.values()), seen, page_size),
+                )
+            stats = sync_employees(db, _unique(ad_users, seen), removed=removed, snapshot=snapshot,
+                                   on_progress=on_progress, pending=pending)
+    except LDAPException as e:
+        # Lotes já gravados ficam; a marca não avança e a próxima execução relê o mesmo intervalo
+        db.rollback()
+        print(f"❌ Erro na sincronização com o AD: {e}")
+        return None
+
+    if full and not seen:
+        return None
+
+    now = datetime.utcnow()
+    state = state or DirectorySyncState(source=SYNC_SOURCE)
+    state.usn, state.dc, state.last_sync_at = marker["usn"], marker["dc"], now
+    if full:
+        state.last_full_sync_at = now
+    db.add(state)
+    db.commit()
+    return {**stats, "mode": "full" if full else "incremental"}
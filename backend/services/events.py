@@ -0,0 +1,111 @@
+import json
+import time
+import select
+import asyncio
+import threading
+from typing import Dict, Optional, Set
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import engine
+
+# Canal do Postgres usado para avisar todos os workers do uvicorn sobre mudanças no mural
+CHANNEL = "zerocore_feed"
+HEARTBEAT_SECONDS = 15
+ACK_COALESCE_SECONDS = 1.0     # Rajadas de ciência viram um único evento por aviso
+SUBSCRIBER_QUEUE_SIZE = 100    # Cliente lento perde eventos em vez de segurar memória
+# Keepalive TCP da conexão do LISTEN: sem isso uma queda silenciosa (NAT, failover) nunca é percebida
+LISTEN_KEEPALIVE = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10, "keepalives_count": 3}
+
+def publish(db: Session, event_type: str, payload: Dict) -> None:
+    """
+    Enfileira um evento via pg_notify na transação corrente.
+    O Postgres só entrega no COMMIT (e descarta no rollback), então ninguém vê evento de dado não gravado.
+    """
+    message = json.dumps({"type": event_type, **payload}, default=str)
+    db.execute(func.pg_notify(CHANNEL, message).select())
+
+class FeedBroker:
+    """
+    Um por worker: mantém uma conexão dedicada com LISTEN (em thread) e repassa cada
+    notificação às filas dos clientes SSE conectados neste processo.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pending_acks: Dict[str, Dict] = {}
+        self._flush_handle = None
+
+    def subscribe(self) -> asyncio.Queue:
+        self._ensure_listener()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def _ensure_listener(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._loop = asyncio.get_running_loop()
+            self._thread = threading.Thread(target=self._listen, name="feed-listener", daemon=True)
+            self._thread.start()
+
+    def _listen(self):
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff, connected_before = 1, False
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn, **LISTEN_KEEPALIVE)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f"LISTEN {CHANNEL}")
+                if connected_before:
+                    # Eventos podem ter se perdido enquanto a conexão caiu: clientes recarregam o mural
+                    self._loop.call_soon_threadsafe(self._broadcast, {"type": "resync"})
+                connected_before, backoff = True, 1
+
+                while True:
+                    if select.select([conn], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                        # Sem notificações: confirma que a conexão está viva (falha cai no reconnect abaixo).
+                        # O que chegar junto com a resposta vai para conn.notifies e é entregue logo abaixo
+                        conn.cursor().execute("SELECT 1")
+                    else:
+                        conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._loop.call_soon_threadsafe(self._dispatch, notify.payload)
+            except Exception as e:
+                print(f"❌ Listener do mural desconectado: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _dispatch(self, raw: str):
+        event = json.loads(raw)
+        if event["type"] == "ack_count":
+            # Guarda só o último valor por aviso e envia em lote
+            self._pending_acks[event["id"]] = event
+            if self._flush_handle is None:
+                self._flush_handle = self._loop.call_later(ACK_COALESCE_SECONDS, self._flush_acks)
+            return
+        self._broadcast(event)
+
+    def _flush_acks(self):
+        pending, self._pending_acks, self._flush_handle = self._pending_acks, {}, None
+        for event in pending.values():
+            self._broadcast(event)
+
+    def _broadcast(self, event: Dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+broker = FeedBroker()
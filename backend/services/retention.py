@@ -0,0 +1,192 @@
+import os
+import re
+import time
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select, update, func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from database import SessionLocal, engine
+from models.announcements import Announcement
+from services import events
+
+# Tabelas usuários × avisos particionadas por mês (RANGE em announcement_created_at)
+PARTITIONED_TABLES = ["announcement_acknowledgments", "announcement_audience"]
+# Horizonte sugerido para o arquivamento por idade (manage.py retention --months); nunca aplicado sozinho
+RETENTION_MONTHS = int(os.getenv("ANNOUNCEMENT_RETENTION_MONTHS", "24"))
+# Schema que recebe as partições desanexadas (armazenamento frio, fora das tabelas quentes)
+COLD_SCHEMA = os.getenv("RETENTION_COLD_SCHEMA", "cold_storage")
+PARTITIONS_AHEAD = 3  # Meses futuros criados com antecedência
+PARTITION_LOCK_TIMEOUT = "5s"
+# Arquivamento automático dos avisos expirados a cada N horas; 0 (padrão) desliga (use manage.py retention via cron)
+RETENTION_INTERVAL_HOURS = float(os.getenv("ANNOUNCEMENT_RETENTION_INTERVAL_HOURS", "0"))
+PARTITION_CHECK_HOURS = 24  # Conferência das partições à frente, mesmo sem o arquivamento agendado
+# Chaves de advisory lock: uma retenção por vez entre os workers do uvicorn, e criação de partições serializada
+RETENTION_LOCK_KEY = 0x5A43_5245_5445  # "ZCRETE"
+PARTITION_LOCK_KEY = 0x5A43_5041_5254  # "ZCPART"
+
+_scheduler: Optional[threading.Thread] = None
+
+_PARTITION_RE = re.compile(r"^(?P<table>.+)_(?P<year>\d{4})_(?P<month>\d{2})$")
+
+def _month_start(d) -> date:
+    return date(d.year, d.month, 1)
+
+def _add_months(d: date, months: int) -> date:
+    total = d.year * 12 + d.month - 1 + months
+    return date(total // 12, total % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+def _create_partition(db: Session, table: str, month: date) -> bool:
+    """Cria a partição do mês se faltar. Retorna False se não deu (as linhas do mês seguem na DEFAULT)."""
+    name = partition_name(table, month)
+    if db.execute(select(func.to_regclass(name))).scalar() is not None:
+        return True
+    try:
+        # Savepoint: uma partição que falha não desfaz as demais
+        with db.begin_nested():
+            # Não fica na fila atrás de leituras longas (e não bloqueia quem chega depois) esperando o lock da tabela
+            db.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+            db.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            ))
+        return True
+    except DBAPIError as e:
+        # Ex.: a DEFAULT já tem linhas desse mês; elas continuam lá e ninguém falha por isso
+        print(f"❌ Partição {name} não criada: {e.orig}")
+        return False
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITIONS_AHEAD) -> List[str]:
+    """
+    Cria com antecedência as partições mensais (do mês atual até `months_ahead` à frente) e a DEFAULT.
+    Roda só em segundo plano (startup/agendamento/manage.py), nunca na publicação de um aviso:
+    DDL numa tabela particionada segura lock exclusivo até o commit. Comita. Retorna as que faltaram.
+    """
+    # Vários workers sobem juntos: um de cada vez (lock da transação), o segundo só confere que já existem
+    db.execute(select(func.pg_advisory_xact_lock(PARTITION_LOCK_KEY)))
+    current = _month_start(datetime.utcnow())
+    missing = []
+    for table in PARTITIONED_TABLES:
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+        for i in range(months_ahead + 1):
+            month = _add_months(current, i)
+            if not _create_partition(db, table, month):
+                missing.append(partition_name(table, month))
+    db.commit()
+    return missing
+
+def _archive(db: Session, condition) -> int:
+    """Arquiva os avisos ativos que atendem a condição e avisa o mural (evento entregue no commit)."""
+    archived = db.execute(
+        update(Announcement)
+        .where(Announcement.is_archived == False, condition)
+        .values(is_archived=True)
+        .returning(Announcement.id, Announcement.category, Announcement.target_dept)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for row in archived:
+        events.publish(db, "announcement_archived", {
+            "id": str(row.id), "category": row.category, "target_dept": row.target_dept,
+        })
+    return len(archived)
+
+def archive_expired(db: Session) -> int:
+    """Arquiva avisos com expires_at vencido. Retorna quantos foram arquivados."""
+    count = _archive(db, Announcement.expires_at <= datetime.utcnow())
+    db.commit()
+    return count
+
+def detach_old_partitions(db: Session, cutoff: date, drop: bool = False) -> List[str]:
+    """
+    Desanexa as partições mensais inteiramente anteriores a `cutoff` e as move para o schema frio
+    (ou apaga, com drop=True). Linhas antigas que caíram na partição DEFAULT permanecem nela.
+    """
+    db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {COLD_SCHEMA}"))
+    moved = []
+    for table in PARTITIONED_TABLES:
+        children = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ), {"parent": table}).scalars().all()
+        for name in sorted(children):
+            match = _PARTITION_RE.match(name)
+            if not match or match["table"] != table:
+                continue
+            month = date(int(match["year"]), int(match["month"]), 1)
+            if _add_months(month, 1) > cutoff:
+                continue
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                db.execute(text(f"DROP TABLE {name}"))
+            else:
+                db.execute(text(f"ALTER TABLE {name} SET SCHEMA {COLD_SCHEMA}"))
+            moved.append(name)
+    return moved
+
+def apply_retention(
+    db: Session, months: Optional[int] = None, detach: bool = False, drop: bool = False,
+) -> Dict:
+    """
+    Rotina de retenção. Sempre arquiva os avisos expirados (expires_at) e cria as partições dos próximos meses.
+    Só com `months` (manage.py retention --months N) arquiva também os publicados antes do horizonte;
+    só com `detach` (--detach/--drop, exige `months`) tira das tabelas quentes as partições de
+    ciência/público desse período. O ack_count dos avisos antigos continua disponível; as listas vão
+    para o schema frio (ou são apagadas com `drop`).
+    """
+    if detach and months is None:
+        raise ValueError("Desanexar partições exige o horizonte em meses.")
+    stats = {"expired_archived": archive_expired(db), "old_archived": 0, "partitions": []}
+    if months is not None:
+        cutoff = _add_months(_month_start(datetime.utcnow()), -months)
+        stats["old_archived"] = _archive(db, Announcement.created_at < cutoff)
+        if detach:
+            stats["partitions"] = detach_old_partitions(db, cutoff, drop)
+        db.commit()
+    ensure_partitions(db)
+    return stats
+
+def _run_scheduled() -> None:
+    # Lock de sessão numa conexão dedicada: só um worker executa, os demais pulam
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if not lock_conn.scalar(select(func.pg_try_advisory_lock(RETENTION_LOCK_KEY))):
+            return
+        db = SessionLocal()
+        try:
+            # Agendado, só o que o próprio aviso pede (expires_at); arquivar por idade e mover partições é manual
+            count = archive_expired(db)
+            print(f"📦 Retenção: {count} aviso(s) expirado(s) arquivado(s).")
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Erro na retenção agendada: {e}")
+        finally:
+            db.close()
+            lock_conn.scalar(select(func.pg_advisory_unlock(RETENTION_LOCK_KEY)))
+
+def _ensure_partitions_safe() -> None:
+    db = SessionLocal()
+    try:
+        ensure_partitions(db)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Partições não criadas: {e}")
+    finally:
+        db.close()
+
+def _schedule_loop() -> None:
+    while True:
+        # Partições à frente sempre (DDL idempotente e fora das requisições); arquivamento só se configurado
+        _ensure_partitions_safe()
+        if RETENTION_INTERVAL_HOURS > 0:
+            _run_scheduled()
+        time.sleep((RETENTION_INTERVAL_HOURS or PARTITION_CHECK_HOURS) * 3600)
+
+def start() -> None:
+    """Startup: cria as partições que faltam (e confere uma vez por dia) e, se configurado, agenda o arquivamento dos expirados."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = threading.Thread(target=_schedule_loop, name="retention-scheduler", daemon=True)
+        _scheduler.start()
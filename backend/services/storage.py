@@ -0,0 +1,109 @@
+import os
+import uuid
+import shutil
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+# Backend de armazenamento dos anexos (hoje só "local"; um stand-in compatível com S3 entra depois)
+STORAGE_BACKEND = os.getenv("ATTACHMENT_STORAGE_BACKEND", "local")
+LOCAL_STORAGE_ROOT = os.getenv("ATTACHMENT_STORAGE_ROOT", "static/uploads/blobs")
+
+def blob_key(sha256: str, filename: str) -> str:
+    """
+    Chave endereçada por conteúdo, em diretórios fatiados pelo hash: ab/cd/abcd...<ext>.
+    A extensão entra na chave para o arquivo continuar sendo servido com o tipo certo.
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+class StorageBackend(ABC):
+    """Interface mínima que qualquer backend de anexos precisa implementar."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put(self, local_path: str, key: str) -> None:
+        """Move o arquivo local para o storage sob `key` (o arquivo de origem deixa de existir)."""
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def iter_keys(self) -> Iterator[Tuple[str, float]]:
+        """Lista (chave, timestamp de modificação) de tudo que está armazenado."""
+        ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Caminho no disco, quando o backend é local (permite abrir sem carregar o arquivo em memória)."""
+        return None
+
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Chave de anexo inválida: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, local_path: str, key: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Grava com nome temporário e renomeia: leitores nunca veem um arquivo pela metade.
+        # Nome único por chamada: duas threads gravando a mesma chave (mesmo conteúdo) não dividem o temporário
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        shutil.move(local_path, tmp_path)
+        os.replace(tmp_path, path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_keys(self) -> Iterator[Tuple[str, float]]:
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if ".tmp-" in name:
+                    continue
+                path = os.path.join(dirpath, name)
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), os.path.getmtime(path)
+
+BACKENDS = {
+    "local": lambda: LocalStorageBackend(LOCAL_STORAGE_ROOT),
+}
+
+_storage = None
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND not in BACKENDS:
+            raise RuntimeError(f"Backend de anexos desconhecido: {STORAGE_BACKEND}")
+        _storage = BACKENDS[STORAGE_BACKEND]()
+    return _storage
@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select, update, func, exists, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from database import SessionLocal, engine
+from models.sync import DirectorySyncJob
+from services import autocomplete
+from services.employee_sync import run_sync, SYNC_SOURCE
+
+# Sincronização automática (incremental) a cada N minutos; 0 desliga o agendamento
+SYNC_INTERVAL_MINUTES = int(os.getenv("AD_SYNC_INTERVAL_MINUTES", "0"))
+# Chave do pg_advisory_lock que garante uma única execução entre todos os workers do uvicorn
+SYNC_LOCK_KEY = 0x5A43_5359_4E43  # "ZCSYNC"
+ACTIVE_STATUSES = ("queued", "running")
+
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+_scheduler: Optional[threading.Thread] = None
+
+def job_to_dict(job: DirectorySyncJob) -> Dict:
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "full": job.full,
+        "trigger": job.trigger,
+        "processed": job.processed,
+        "stats": job.stats,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+def enqueue(
+    db: Session, full: bool = False, trigger: str = "manual", requested_by=None, wake: bool = True,
+) -> Tuple[DirectorySyncJob, bool]:
+    """
+    Coloca uma sincronização na fila e (com `wake`) acorda o worker deste processo.
+    Se já houver uma na fila/rodando (em qualquer worker), devolve essa. Retorna (job, criado).
+    """
+    stmt = pg_insert(DirectorySyncJob).values(
+        source=SYNC_SOURCE, status="queued", full=full, trigger=trigger,
+        requested_by=requested_by, created_at=datetime.utcnow(),
+    ).on_conflict_do_nothing(
+        index_elements=[DirectorySyncJob.source],
+        index_where=DirectorySyncJob.status.in_(ACTIVE_STATUSES),
+    ).returning(DirectorySyncJob.id)
+    job_id = db.execute(stmt).scalar()
+    db.commit()
+
+    if job_id is None:
+        active = db.execute(
+            select(DirectorySyncJob).where(
+                DirectorySyncJob.source == SYNC_SOURCE, DirectorySyncJob.status.in_(ACTIVE_STATUSES)
+            )
+        ).scalar_one_or_none()
+        if active:
+            if wake:
+                kick()  # Se quem rodava morreu, o worker marca a execução como interrompida
+            return active, False
+        return enqueue(db, full, trigger, requested_by, wake)  # A ativa terminou entre o INSERT e o SELECT
+
+    if wake:
+        kick()
+    return db.get(DirectorySyncJob, job_id), True
+
+def _enqueue_if_due() -> None:
+    """Agendamento: enfileira só se nenhuma execução começou no último intervalo (checagem e INSERT atômicos)."""
+    since = datetime.utcnow() - timedelta(minutes=SYNC_INTERVAL_MINUTES)
+    recent = exists().where(DirectorySyncJob.source == SYNC_SOURCE, DirectorySyncJob.created_at > since)
+    db = SessionLocal()
+    try:
+        stmt = pg_insert(DirectorySyncJob).from_select(
+            ["id", "source", "status", "full", "trigger", "processed", "created_at"],
+            select(func.gen_random_uuid(), literal(SYNC_SOURCE), literal("queued"), literal(False),
+                   literal("schedule"), literal(0), literal(datetime.utcnow())).where(~recent),
+        ).on_conflict_do_nothing(
+            index_elements=[DirectorySyncJob.source],
+            index_where=DirectorySyncJob.status.in_(ACTIVE_STATUSES),
+        )
+        db.execute(stmt)
+        db.commit()
+    finally:
+        db.close()
+
+def _update_job(job_id, **fields) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(DirectorySyncJob).where(DirectorySyncJob.id == job_id).values(**fields))
+        db.commit()
+    finally:
+        db.close()
+
+def _claim() -> Optional[Tuple]:
+    """Marca a próxima da fila como running (só é chamada por quem detém o advisory lock)."""
+    db = SessionLocal()
+    try:
+        # Se há job "running" e nós temos o lock, o worker que o rodava morreu no meio
+        db.execute(
+            update(DirectorySyncJob)
+            .where(DirectorySyncJob.source == SYNC_SOURCE, DirectorySyncJob.status == "running")
+            .values(status="failed", error="Execução interrompida (processo encerrado).", finished_at=datetime.utcnow())
+        )
+        next_id = select(DirectorySyncJob.id).where(
+            DirectorySyncJob.source == SYNC_SOURCE, DirectorySyncJob.status == "queued"
+        ).order_by(DirectorySyncJob.created_at).limit(1).scalar_subquery()
+        row = db.execute(
+            update(DirectorySyncJob).where(DirectorySyncJob.id == next_id)
+            .values(status="running", started_at=datetime.utcnow())
+            .returning(DirectorySyncJob.id, DirectorySyncJob.full)
+        ).first()
+        db.commit()
+        return row
+    finally:
+        db.close()
+
+def _run(job_id, full: bool) -> None:
+    def progress(stats: Dict):
+        _update_job(job_id, processed=sum(stats.values()), stats=stats)
+
+    db = SessionLocal()
+    try:
+        stats = run_sync(db, full, on_progress=progress)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Sincronização {job_id} falhou: {e}")
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+        return
+    finally:
+        db.close()
+
+    if stats is None:
+        _update_job(job_id, status="failed", error="Não foi possível conectar ao AD.", finished_at=datetime.utcnow())
+        return
+
+    changed = stats.pop("changed_user_ids")
+    counts = {k: stats[k] for k in ("created", "updated", "deactivated", "unchanged")}
+    _update_job(job_id, status="succeeded", processed=sum(counts.values()), stats=stats, finished_at=datetime.utcnow())
+    print(f"🔄 Sincronização {job_id} ({stats['mode']}): {len(changed)} colaborador(es) alterado(s).")
+    if changed:
+        # Carga em massa: reconstrói o índice do autocomplete deste worker (os demais se atualizam sozinhos)
+        autocomplete.index.rebuild()
+
+def _has_queued() -> bool:
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(exists().where(DirectorySyncJob.source == SYNC_SOURCE, DirectorySyncJob.status == "queued"))
+        ).scalar()
+    finally:
+        db.close()
+
+def run_pending() -> None:
+    """Roda a fila nesta thread enquanto detém o advisory lock; se outro processo tem o lock, ele cuida da fila."""
+    while True:
+        # Conexão dedicada em autocommit: o lock é de sessão e não segura transação aberta durante a sincronização
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+            if not lock_conn.scalar(select(func.pg_try_advisory_lock(SYNC_LOCK_KEY))):
+                return
+            try:
+                while (job := _claim()) is not None:
+                    _run(job.id, job.full)
+            finally:
+                lock_conn.scalar(select(func.pg_advisory_unlock(SYNC_LOCK_KEY)))
+        # Algo pode ter entrado na fila enquanto o lock era liberado
+        if not _has_queued():
+            return
+
+def _worker_loop() -> None:
+    global _worker
+    while True:
+        _wake.clear()
+        try:
+            run_pending()
+        except Exception as e:
+            print(f"❌ Erro no worker de sincronização: {e}")
+        with _worker_lock:
+            # Um kick() durante a execução pede mais uma volta em vez de se perder
+            if not _wake.is_set():
+                _worker = None
+                return
+
+def kick() -> None:
+    """Acorda o worker de sincronização deste processo (uma thread por processo)."""
+    global _worker
+    with _worker_lock:
+        _wake.set()
+        if _worker is None:
+            _worker = threading.Thread(target=_worker_loop, name="ad-sync-worker", daemon=True)
+            _worker.start()
+
+def _schedule_loop() -> None:
+    while True:
+        time.sleep(SYNC_INTERVAL_MINUTES * 60)
+        try:
+            _enqueue_if_due()
+            kick()
+        except Exception as e:
+            print(f"❌ Erro ao agendar sincronização com o AD: {e}")
+
+def start() -> None:
+    """Startup do worker: retoma o que ficou na fila e, se configurado, liga o agendamento."""
+    global _scheduler
+    kick()
+    if SYNC_INTERVAL_MINUTES > 0 and _scheduler is None:
+        _scheduler = threading.Thread(target=_schedule_loop, name="ad-sync-scheduler", daemon=True)
+        _scheduler.start()
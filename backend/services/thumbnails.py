@@ -0,0 +1,98 @@
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from sqlalchemy import update
+from database import SessionLocal
+from models.attachments import AttachmentBlob
+from services.storage import get_storage
+from services.uploads import STAGING_DIR
+
+# Pillow e PyMuPDF são opcionais: sem eles o mural só não exibe prévias
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+THUMBNAIL_MAX_SIZE = (480, 480)
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"}
+
+# Criado na importação: sem corrida entre as primeiras chamadas de schedule() (as threads só sobem quando usadas)
+_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnails")
+
+def thumbnail_key(key: str) -> str:
+    """A miniatura fica ao lado do original no storage: <chave>.thumb.jpg"""
+    return f"{key}.thumb.jpg"
+
+def _can_render(ext: str) -> bool:
+    if ext in IMAGE_EXTENSIONS:
+        return Image is not None
+    if ext == ".pdf":
+        return Image is not None and pymupdf is not None
+    return False
+
+def _render_pdf(doc):
+    # Só a primeira página, rasterizada já em baixa resolução
+    page = doc[0]
+    zoom = min(THUMBNAIL_MAX_SIZE[0] / page.rect.width, THUMBNAIL_MAX_SIZE[1] / page.rect.height)
+    pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+def _render(key: str, ext: str):
+    """Gera a miniatura (PIL.Image) a partir do arquivo no storage."""
+    storage = get_storage()
+    if ext == ".pdf":
+        path = storage.local_path(key)
+        if path:
+            # Aberto pelo caminho: o PyMuPDF lê só as páginas que usa, sem trazer o PDF inteiro para a memória
+            with pymupdf.open(path, filetype="pdf") as doc:
+                return _render_pdf(doc)
+        with storage.open(key) as f, pymupdf.open(stream=f.read(), filetype="pdf") as doc:
+            return _render_pdf(doc)
+
+    with storage.open(key) as f:
+        img = Image.open(f)
+        img.draft("RGB", THUMBNAIL_MAX_SIZE)  # JPEG: decodifica direto em escala reduzida
+        img.thumbnail(THUMBNAIL_MAX_SIZE)
+        return img.convert("RGB")
+
+def generate_thumbnail(key: str) -> Optional[str]:
+    """
+    Gera e grava a miniatura do blob, registrando-a em attachment_blobs.thumbnail_key.
+    Retorna a chave da miniatura ou None se o tipo não tem prévia.
+    """
+    ext = os.path.splitext(key)[1].lower()
+    if not _can_render(ext):
+        return None
+
+    storage = get_storage()
+    thumb_key = thumbnail_key(key)
+    if not storage.exists(thumb_key):
+        img = _render(key, ext)
+        os.makedirs(STAGING_DIR, exist_ok=True)
+        tmp_path = os.path.join(STAGING_DIR, f"{uuid.uuid4()}.jpg")
+        img.save(tmp_path, "JPEG", quality=80, optimize=True)
+        storage.put(tmp_path, thumb_key)
+
+    db = SessionLocal()
+    try:
+        db.execute(update(AttachmentBlob).where(AttachmentBlob.key == key).values(thumbnail_key=thumb_key))
+        db.commit()
+    finally:
+        db.close()
+    return thumb_key
+
+def _run(key: str):
+    try:
+        generate_thumbnail(key)
+    except Exception as e:
+        print(f"❌ Erro ao gerar miniatura de {key}: {e}")
+
+def schedule(key: str):
+    """Enfileira a geração da miniatura no pool de workers (não bloqueia a requisição)."""
+    _executor.submit(_run, key)
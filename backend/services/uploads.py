@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+from typing import AsyncIterator, Dict
+from fastapi import UploadFile, HTTPException
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+# Tamanho do bloco lido/gravado por vez e limite por arquivo (configuráveis via ambiente)
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE_MB", "100")) * 1024 * 1024
+# Folga para os demais campos do form e os delimitadores do multipart
+MULTIPART_OVERHEAD = 1024 * 1024
+
+# Uploads retomáveis em andamento. Fica FORA de static/ para nunca ser servido publicamente.
+PARTIAL_DIR = os.getenv("UPLOAD_PARTIAL_DIR", "uploads_tmp")
+# Arquivos já recebidos aguardando a entrada no storage de anexos
+STAGING_DIR = os.path.join(PARTIAL_DIR, "staging")
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Arquivo excede o limite de {MAX_UPLOAD_SIZE // (1024 * 1024)} MB.")
+
+class MultipartSizeLimitMiddleware:
+    """
+    Limita o corpo multipart/form-data enquanto ele chega. O FastAPI lê (e grava em disco) o form
+    inteiro antes de chamar a rota, então a checagem de save_upload sozinha viria tarde demais:
+    Content-Length acima do limite é recusado antes de ler um byte, e sem Content-Length (chunked)
+    a leitura é interrompida com 413 assim que passa do limite.
+    """
+
+    def __init__(self, app, limit: int):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return await self.app(scope, receive, send)
+
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.limit:
+            error = _too_large()
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers={"Connection": "close"})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise _too_large()  # Repassada pelo FastAPI durante a leitura do form: vira 413
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+def _write_chunk(out, hasher, chunk: bytes):
+    """Grava e atualiza o hash em thread, fora do event loop."""
+    out.write(chunk)
+    if hasher is not None:
+        hasher.update(chunk)
+
+async def _iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+async def _stream_to(out, chunks: AsyncIterator[bytes], written: int, limit: int, hasher=None) -> int:
+    """Copia os blocos para `out` respeitando o limite enquanto recebe. Retorna o total gravado."""
+    async for chunk in chunks:
+        written += len(chunk)
+        if written > limit:
+            raise _too_large()
+        await run_in_threadpool(_write_chunk, out, hasher, chunk)
+    return written
+
+async def save_upload(file: UploadFile, dest_dir: str) -> Dict:
+    """
+    Salva um UploadFile em `dest_dir` bloco a bloco (I/O em thread pool), calculando o SHA-256
+    durante a cópia. Arquivos acima de MAX_UPLOAD_SIZE são rejeitados com 413 e descartados.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    stored_name = f"{uuid.uuid4()}{os.path.splitext(file.filename or '')[1]}"
+    path = os.path.join(dest_dir, stored_name)
+    hasher = hashlib.sha256()
+
+    out = await run_in_threadpool(open, path, "wb")
+    try:
+        size = await _stream_to(out, _iter_upload(file), 0, MAX_UPLOAD_SIZE, hasher)
+    except BaseException:
+        await run_in_threadpool(out.close)
+        await run_in_threadpool(os.remove, path)
+        raise
+    await run_in_threadpool(out.close)
+
+    return {"path": path, "stored_name": stored_name, "filename": file.filename, "sha256": hasher.hexdigest(), "size": size}
+
+# --- Uploads retomáveis -------------------------------------------------------------------
+# Cada upload é um par <id>.part (bytes recebidos) + <id>.json (metadados) em PARTIAL_DIR.
+# O progresso é o próprio tamanho do .part, então qualquer worker do uvicorn pode continuar.
+
+def _partial_paths(upload_id: str):
+    try:
+        upload_id = str(uuid.UUID(upload_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload não encontrado.")
+    base = os.path.join(PARTIAL_DIR, upload_id)
+    return f"{base}.part", f"{base}.json"
+
+def _load_meta(upload_id: str, user_id: str) -> Dict:
+    data_path, meta_path = _partial_paths(upload_id)
+    if not os.path.exists(meta_path):
+        raise HTTPException(status_code=404, detail="Upload não encontrado.")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta["user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Upload pertence a outro usuário.")
+    meta["received"] = os.path.getsize(data_path)
+    return meta
+
+def create_resumable(user_id: str, filename: str, size: int) -> Dict:
+    """Abre uma sessão de upload retomável para um arquivo de `size` bytes."""
+    if size > MAX_UPLOAD_SIZE:
+        raise _too_large()
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    upload_id = str(uuid.uuid4())
+    data_path, meta_path = _partial_paths(upload_id)
+    meta = {"upload_id": upload_id, "user_id": user_id, "filename": filename, "size": size, "created_at": time.time()}
+    open(data_path, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return {**meta, "received": 0, "chunk_size": UPLOAD_CHUNK_SIZE}
+
+def get_resumable(upload_id: str, user_id: str) -> Dict:
+    return _load_meta(upload_id, user_id)
+
+async def append_resumable(upload_id: str, user_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict:
+    """
+    Acrescenta bytes ao upload a partir de `offset`, que precisa ser igual ao já recebido
+    (senão 409 com o offset correto, para o cliente retomar de onde parou).
+    """
+    meta = await run_in_threadpool(_load_meta, upload_id, user_id)
+    data_path, _ = _partial_paths(upload_id)
+
+    out = await run_in_threadpool(open, data_path, "ab")
+    try:
+        # Impede dois envios simultâneos para o mesmo upload (mesmo em workers diferentes)
+        try:
+            fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(status_code=409, detail="Upload já está recebendo dados.")
+
+        received = os.path.getsize(data_path)
+        if offset != received:
+            raise HTTPException(status_code=409, detail={"message": "Offset divergente.", "received": received})
+
+        meta["received"] = await _stream_to(out, chunks, received, meta["size"])
+    finally:
+        await run_in_threadpool(out.close)
+    return meta
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def finalize_resumable(upload_id: str, user_id: str, dest_dir: str) -> Dict:
+    """Move um upload completo para `dest_dir` (bloqueante: chamar via run_in_threadpool)."""
+    meta = _load_meta(upload_id, user_id)
+    if meta["received"] != meta["size"]:
+        raise HTTPException(status_code=409, detail={"message": "Upload incompleto.", "received": meta["received"]})
+
+    data_path, meta_path = _partial_paths(upload_id)
+    sha256 = _hash_file(data_path)
+
+    os.makedirs(dest_dir, exist_ok=True)
+    stored_name = f"{uuid.uuid4()}{os.path.splitext(meta['filename'] or '')[1]}"
+    path = os.path.join(dest_dir, stored_name)
+    shutil.move(data_path, path)
+    os.remove(meta_path)
+
+    return {"path": path, "stored_name": stored_name, "filename": meta["filename"], "sha256": sha256, "size": meta["size"]}
+
+def purge_stale_uploads(max_age_hours: int) -> int:
+    """Remove uploads retomáveis e arquivos em staging abandonados há mais de `max_age_hours`."""
+    if not os.path.isdir(PARTIAL_DIR):
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for name in os.listdir(PARTIAL_DIR):
+        path = os.path.join(PARTIAL_DIR, name)
+        if not name.endswith(".json"):
+            continue
+        data_path = path[:-len(".json")] + ".part"
+        # A última gravação no .part marca a atividade do upload
+        last_activity = os.path.getmtime(data_path) if os.path.exists(data_path) else os.path.getmtime(path)
+        if last_activity < cutoff:
+            for p in (path, data_path):
+                if os.path.exists(p): os.remove(p)
+            removed += 1
+    # Sobras de uploads concluídos que não chegaram ao storage (ex.: queda do worker)
+    if os.path.isdir(STAGING_DIR):
+        for name in os.listdir(STAGING_DIR):
+            path = os.path.join(STAGING_DIR, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
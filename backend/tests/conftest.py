@@ -0,0 +1,138 @@
+"""
+Fixtures compartilhadas dos testes.
+
+Banco: usa o de DATABASE_URL já migrado (alembic upgrade head). Cada teste roda dentro de uma transação
+desfeita no final: os commits do código testado viram SAVEPOINTs dessa transação, então nada do que o
+teste grava fica no banco nem vaza para o próximo. Sem banco, esses testes são pulados.
+
+AD: `fake_ad` troca o servidor por um diretório em memória (ldap3 MOCK_SYNC) servido pelo pool de verdade.
+"""
+import uuid
+from typing import Iterable
+import pytest
+from fastapi.testclient import TestClient
+from ldap3 import Server, Connection, MOCK_SYNC, OFFLINE_AD_2012_R2, MODIFY_REPLACE
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import engine, get_db
+from auth import ad_service
+from auth.ldap_pool import LDAPConnectionPool
+from auth.security import get_current_user
+
+@pytest.fixture(scope="session")
+def database():
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except OperationalError:
+        pytest.skip("Banco de testes indisponível (DATABASE_URL)")
+    return engine
+
+@pytest.fixture
+def connection(database):
+    conn = database.connect()
+    outer = conn.begin()
+    yield conn
+    outer.rollback()
+    conn.close()
+
+@pytest.fixture
+def session_factory(connection):
+    """Fábrica de sessões presa à transação do teste (substitui SessionLocal nos serviços)."""
+    return sessionmaker(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+@pytest.fixture
+def client(db):
+    from main import app  # Importar o app já conecta no banco (create_all): só depois da checagem acima
+
+    def override_get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: {
+        "id": str(uuid.uuid4()), "username": "tester", "role": "admin", "depts": [], "permissions": [],
+    }
+    yield TestClient(app)  # Sem "with": não dispara os workers do startup
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_current_user, None)
+
+class FakeAD:
+    """
+    Diretório em memória: todas as conexões abertas por `connect` enxergam as mesmas entradas.
+    Como no AD, cada gravação feita por aqui dá um uSNChanged novo à entrada e avança o
+    highestCommittedUSN do rootDSE.
+    """
+
+    def __init__(self):
+        self.server = Server("fake-ad", get_info=OFFLINE_AD_2012_R2)
+        self.usn = 1000
+        self.opened = 0
+        self.conn = self.connect()
+        self.server.info.other["highestCommittedUSN"] = [str(self.usn)]
+
+    def connect(self) -> Connection:
+        self.opened += 1
+        conn = Connection(self.server, client_strategy=MOCK_SYNC)
+        conn.bind()
+        return conn
+
+    def next_usn(self) -> int:
+        self.usn += 1
+        self.server.info.other["highestCommittedUSN"] = [str(self.usn)]
+        return self.usn
+
+    @staticmethod
+    def group_dn(dept: str) -> str:
+        return f"CN=ZC_DEPT_{dept},{ad_service.GROUPS_OU}"
+
+    @staticmethod
+    def user_dn(username: str) -> str:
+        return f"CN={username},OU=Usuarios,{ad_service.AD_BASE_DN}"
+
+    def add_group(self, dept: str) -> str:
+        dn = self.group_dn(dept)
+        self.conn.strategy.add_entry(dn, {
+            "objectClass": ["top", "group"], "cn": f"ZC_DEPT_{dept}", "sAMAccountName": f"ZC_DEPT_{dept}",
+            "distinguishedName": dn, "uSNChanged": self.next_usn(),
+        })
+        return dn
+
+    def add_user(self, username: str, depts: Iterable[str] = (), **attrs) -> str:
+        dn = self.user_dn(username)
+        self.conn.strategy.add_entry(dn, {
+            "objectClass": ["top", "person", "user"], "objectCategory": "person", "sAMAccountType": 805306368,
+            "sAMAccountName": username, "displayName": username.title(), "userAccountControl": 512,
+            "distinguishedName": dn, "memberOf": [self.group_dn(d) for d in depts], "uSNChanged": self.next_usn(),
+            **attrs,
+        })
+        return dn
+
+    def modify_user(self, username: str, **attrs) -> None:
+        changes = {name: [(MODIFY_REPLACE, [value])] for name, value in attrs.items()}
+        changes["uSNChanged"] = [(MODIFY_REPLACE, [self.next_usn()])]
+        self.conn.modify(self.user_dn(username), changes)
+
+    def set_user_depts(self, username: str, old: Iterable[str], new: Iterable[str]) -> None:
+        """Troca os grupos do usuário: no AD quem ganha uSNChanged novo são os grupos, não o usuário."""
+        self.conn.modify(self.user_dn(username), {"memberOf": [(MODIFY_REPLACE, [self.group_dn(d) for d in new])]})
+        for dept in set(old) | set(new):
+            self.conn.modify(self.group_dn(dept), {"uSNChanged": [(MODIFY_REPLACE, [self.next_usn()])]})
+
+    def members(self, dept: str) -> list:
+        self.conn.search(self.group_dn(dept), "(objectClass=group)", search_scope="BASE", attributes=["member"])
+        return [str(dn) for dn in self.conn.entries[0].member] if self.conn.entries else []
+
+@pytest.fixture
+def fake_ad(monkeypatch):
+    ad = FakeAD()
+    pool = LDAPConnectionPool(ad.connect, size=2, idle_seconds=300, healthcheck_seconds=300, timeout=1)
+    monkeypatch.setattr(ad_service, "_pool", pool)
+    return ad
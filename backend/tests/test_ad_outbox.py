@@ -0,0 +1,141 @@
+"""
+Outbox de grupos do AD (ad_group_outbox): reserva, confirmação e falha só valem para a versão enviada;
+falhas voltam para a fila com backoff exponencial.
+Banco na transação do teste e AD em memória (ver conftest.py).
+"""
+from datetime import datetime, timedelta
+import pytest
+from ldap3.core.exceptions import LDAPSocketOpenError
+from sqlalchemy import delete, update
+
+from auth.ad_service import ADService
+from models.sync import ADGroupOutbox
+from services import ad_outbox
+
+@pytest.fixture
+def outbox(db, session_factory, monkeypatch):
+    # Fila vazia dentro da transação do teste; o worker abre as sessões dele na mesma transação
+    db.execute(delete(ADGroupOutbox))
+    db.commit()
+    monkeypatch.setattr(ad_outbox, "SessionLocal", session_factory)
+    return db
+
+def _row(db, username):
+    db.expire_all()
+    return db.get(ADGroupOutbox, username)
+
+def test_enqueue_merges_pending_edits(outbox):
+    ad_outbox.enqueue(outbox, "joao", ["TI"])
+    outbox.commit()
+    ad_outbox.enqueue(outbox, "joao", ["TI", "RH"])
+    outbox.commit()
+
+    row = _row(outbox, "joao")
+    assert row.depts == ["TI", "RH"]
+    assert row.version == 2
+    assert ad_outbox.pending_usernames(outbox) == {"joao"}
+
+def test_claim_leases_due_rows_once(outbox):
+    ad_outbox.enqueue(outbox, "joao", ["TI"])
+    ad_outbox.enqueue(outbox, "maria", ["RH"])
+    outbox.commit()
+
+    claimed = ad_outbox._claim(outbox, 10)
+    assert sorted(r.username for r in claimed) == ["joao", "maria"]
+    assert _row(outbox, "joao").next_attempt_at > datetime.utcnow() + timedelta(seconds=ad_outbox.OUTBOX_LEASE_SECONDS - 60)
+    assert ad_outbox._claim(outbox, 10) == []  # Reservadas: ninguém pega de novo antes do lease vencer
+
+def test_done_keeps_row_edited_while_sending(outbox):
+    ad_outbox.enqueue(outbox, "joao", ["TI"])
+    outbox.commit()
+    [sent] = ad_outbox._claim(outbox, 10)
+
+    ad_outbox.enqueue(outbox, "joao", ["RH"])  # Nova edição enquanto o AD era gravado
+    outbox.commit()
+    ad_outbox._done(outbox, sent)
+    outbox.commit()
+
+    row = _row(outbox, "joao")
+    assert row is not None and row.version == sent.version + 1
+    assert row.depts == ["RH"]
+
+def test_done_deletes_sent_version(outbox):
+    ad_outbox.enqueue(outbox, "joao", ["TI"])
+    outbox.commit()
+    [sent] = ad_outbox._claim(outbox, 10)
+
+    ad_outbox._done(outbox, sent)
+    outbox.commit()
+    assert _row(outbox, "joao") is None
+
+def test_failed_ignores_stale_version(outbox):
+    ad_outbox.enqueue(outbox, "joao", ["TI"])
+    outbox.commit()
+    [sent] = ad_outbox._claim(outbox, 10)
+
+    ad_outbox.enqueue(outbox, "joao", ["RH"])
+    outbox.commit()
+    ad_outbox._failed(outbox, sent, RuntimeError("AD recusou"))
+    outbox.commit()
+
+    row = _row(outbox, "joao")
+    assert row.attempts == 0 and row.last_error is None
+    assert row.next_attempt_at <= datetime.utcnow()  # A edição nova continua vencida, pronta para envio
+
+def test_process_batch_writes_groups_to_ad(outbox, fake_ad):
+    fake_ad.add_group("TI")
+    user_dn = fake_ad.add_user("joao")
+    ad_outbox.enqueue(outbox, "joao", ["TI", "FINANCEIRO"])
+    outbox.commit()
+
+    assert ad_outbox.process_batch() == {"sent": 1, "failed": 0}
+    assert fake_ad.members("TI") == [user_dn]
+    assert fake_ad.members("FINANCEIRO") == [user_dn]  # Grupo criado na hora
+    assert _row(outbox, "joao") is None
+
+def test_backoff_doubles_up_to_the_limit():
+    base = ad_outbox.OUTBOX_BACKOFF_SECONDS
+    assert ad_outbox._backoff(0) == timedelta(seconds=base)
+    assert ad_outbox._backoff(3) == timedelta(seconds=base * 8)
+    assert ad_outbox._backoff(50) == timedelta(seconds=ad_outbox.OUTBOX_MAX_BACKOFF_SECONDS)
+
+def test_ad_unavailable_postpones_whole_batch(outbox, monkeypatch):
+    calls = []
+
+    def unavailable(username, depts):
+        calls.append(username)
+        raise LDAPSocketOpenError("DC fora do ar")
+
+    monkeypatch.setattr(ADService, "set_user_groups", unavailable)
+    for name in ("ana", "joao", "maria"):
+        ad_outbox.enqueue(outbox, name, ["TI"])
+    outbox.commit()
+
+    assert ad_outbox.process_batch() == {"sent": 0, "failed": 3}
+    assert len(calls) == 1  # Desiste do lote no primeiro erro de conexão
+    for name in ("ana", "joao", "maria"):
+        row = _row(outbox, name)
+        assert row.attempts == 1 and "DC fora do ar" in row.last_error
+        assert row.next_attempt_at > datetime.utcnow() + ad_outbox._backoff(0) - timedelta(seconds=5)
+    assert ad_outbox.process_batch() == {"sent": 0, "failed": 0}  # Ninguém vencido ainda
+
+def test_single_failure_does_not_stop_the_batch(outbox, fake_ad):
+    fake_ad.add_user("joao")
+    ad_outbox.enqueue(outbox, "fantasma", ["TI"])  # Não existe no AD
+    ad_outbox.enqueue(outbox, "joao", ["TI"])
+    outbox.commit()
+
+    assert ad_outbox.process_batch() == {"sent": 1, "failed": 1}
+    assert _row(outbox, "joao") is None
+    assert _row(outbox, "fantasma").attempts == 1
+
+def test_retry_failed_requeues_exhausted_rows(outbox, fake_ad):
+    user_dn = fake_ad.add_user("joao")
+    ad_outbox.enqueue(outbox, "joao", ["TI"])
+    outbox.execute(update(ADGroupOutbox).values(attempts=ad_outbox.OUTBOX_MAX_ATTEMPTS))
+    outbox.commit()
+    assert ad_outbox.process_batch() == {"sent": 0, "failed": 0}  # Esgotada: fica parada
+
+    assert ad_outbox.retry_failed(outbox) == 1
+    assert ad_outbox.drain() == {"sent": 1, "failed": 0}
+    assert fake_ad.members("TI") == [user_dn]
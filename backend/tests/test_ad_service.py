@@ -0,0 +1,120 @@
+"""
+Leitura paginada do AD e pool de conexões da conta de serviço, contra o diretório em memória (ver conftest.py).
+Não usam o banco.
+"""
+import pytest
+from ldap3 import Connection
+from ldap3.core.exceptions import LDAPSocketOpenError
+
+from auth import ad_service
+from auth.ad_service import ADService
+from auth.ldap_pool import LDAPConnectionPool, LDAPPoolExhausted
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Registra (paged_size, entradas devolvidas) de cada busca feita em qualquer conexão."""
+    calls = []
+    original = Connection.search
+
+    def search(self, *args, **kwargs):
+        result = original(self, *args, **kwargs)
+        calls.append((kwargs.get("paged_size"), len(self.entries)))
+        return result
+
+    monkeypatch.setattr(Connection, "search", search)
+    return calls
+
+def test_iter_users_reads_every_page(fake_ad, searches):
+    fake_ad.add_group("TI")
+    for i in range(5):
+        fake_ad.add_user(f"user{i}", depts=["TI"] if i % 2 else [], department="RH")
+
+    users = list(ADService.iter_users(page_size=2))
+
+    assert sorted(u["username"] for u in users) == [f"user{i}" for i in range(5)]
+    assert [size for size, _ in searches] == [2, 2, 2]
+    assert [count for _, count in searches] == [2, 2, 1]
+    by_name = {u["username"]: u for u in users}
+    assert sorted(by_name["user1"]["depts"]) == ["RH", "TI"]
+    assert by_name["user0"]["depts"] == ["RH"]
+
+def test_iter_users_is_lazy(fake_ad, searches):
+    for i in range(5):
+        fake_ad.add_user(f"user{i}")
+
+    users = ADService.iter_users(page_size=2)
+    next(users)
+    assert len(searches) == 1  # Só a primeira página foi pedida
+    users.close()
+
+def test_iter_users_returns_connection_to_pool(fake_ad):
+    fake_ad.add_user("user0")
+    list(ADService.iter_users(page_size=2))
+    list(ADService.iter_users(page_size=2))
+
+    # FakeAD abre uma conexão própria; o pool abriu uma e a reaproveitou
+    assert fake_ad.opened == 2
+    assert len(ad_service._pool._idle) == 1
+
+def test_iter_users_error_propagates_and_discards_connection(fake_ad, monkeypatch):
+    fake_ad.add_user("user0")
+
+    def broken(*args, **kwargs):
+        raise LDAPSocketOpenError("DC fora do ar")
+
+    with ad_service._pool.connection() as conn:
+        monkeypatch.setattr(conn, "search", broken)
+    with pytest.raises(LDAPSocketOpenError):
+        list(ADService.iter_users(page_size=2))
+
+    assert conn.closed
+    assert len(ad_service._pool._idle) == 0
+
+@pytest.fixture
+def pool(fake_ad):
+    return LDAPConnectionPool(fake_ad.connect, size=2, idle_seconds=300, healthcheck_seconds=300, timeout=0.1)
+
+def test_pool_reuses_last_returned_connection(fake_ad, pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert second is first
+    assert fake_ad.opened == 2  # A do FakeAD + uma do pool
+
+def test_pool_discards_connection_on_error(fake_ad, pool):
+    with pytest.raises(RuntimeError):
+        with pool.connection() as broken:
+            raise RuntimeError("erro no meio da operação")
+    assert broken.closed
+
+    with pool.connection() as fresh:
+        assert fresh is not broken
+    assert fake_ad.opened == 3
+
+def test_pool_raises_when_exhausted(pool):
+    with pool.connection(), pool.connection():
+        with pytest.raises(LDAPPoolExhausted):
+            with pool.connection():
+                pass
+    with pool.connection():
+        pass  # Os slots voltaram
+
+def test_pool_replaces_idle_connection_that_fails_healthcheck(fake_ad, pool, monkeypatch):
+    with pool.connection() as stale:
+        pass
+    pool.healthcheck_seconds = 0
+    monkeypatch.setattr(LDAPConnectionPool, "_healthy", staticmethod(lambda conn: False))
+
+    with pool.connection() as conn:
+        assert conn is not stale
+    assert stale.closed
+
+def test_pool_drops_connections_idle_too_long(fake_ad, pool):
+    with pool.connection() as old:
+        pass
+    pool.idle_seconds = 0
+
+    with pool.connection() as conn:
+        assert conn is not old
+    assert old.closed
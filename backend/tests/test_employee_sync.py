@@ -0,0 +1,91 @@
+"""
+Sincronização com o AD (run_sync): a primeira execução lê o diretório inteiro; as seguintes só o que
+mudou depois da marca uSNChanged. Banco na transação do teste e AD em memória (ver conftest.py).
+"""
+import uuid
+import pytest
+from sqlalchemy import delete, select
+
+from models.users import User, Employee
+from models.sync import ADGroupOutbox, DirectorySyncState
+from services import employee_sync
+
+PREFIX = f"s{uuid.uuid4().hex[:6]}"
+NAMES = [f"{PREFIX}.{i}" for i in range(4)]
+
+@pytest.fixture
+def directory(db, fake_ad):
+    # Sem marca gravada nem alterações pendentes dentro da transação do teste
+    db.execute(delete(DirectorySyncState))
+    db.execute(delete(ADGroupOutbox))
+    db.commit()
+    fake_ad.add_group("TI")
+    fake_ad.add_group("RH")
+    for i, name in enumerate(NAMES):
+        fake_ad.add_user(name, depts=["TI"] if i % 2 else ["RH"])
+    return fake_ad
+
+def _sync(db, full=False):
+    stats = employee_sync.run_sync(db, full, page_size=2)
+    assert stats is not None
+    stats.pop("changed_user_ids")
+    return stats
+
+def _employee(db, username):
+    db.expire_all()
+    return db.execute(
+        select(User.is_active, Employee.title, Employee.department, Employee.meta)
+        .join(Employee, Employee.user_id == User.id).where(User.username == username)
+    ).one()
+
+def test_first_run_is_full_and_records_watermark(db, directory):
+    stats = _sync(db)
+
+    assert stats["mode"] == "full"
+    assert stats["created"] == len(NAMES)
+    assert _employee(db, NAMES[1]).department == "TI"
+    state = db.get(DirectorySyncState, employee_sync.SYNC_SOURCE)
+    assert state.usn == directory.usn and state.last_full_sync_at is not None
+
+def test_incremental_run_reads_only_changes(db, directory):
+    _sync(db)
+
+    stats = _sync(db)
+    assert stats["mode"] == "incremental"
+    assert (stats["created"], stats["updated"], stats["deactivated"], stats["unchanged"]) == (0, 0, 0, 0)
+
+    directory.modify_user(NAMES[0], title="gerente")
+    stats = _sync(db)
+    assert (stats["updated"], stats["unchanged"]) == (1, 0)
+    assert _employee(db, NAMES[0]).title == "GERENTE"
+
+def test_incremental_run_picks_up_group_changes(db, directory):
+    _sync(db)
+
+    # Só os grupos ganham uSNChanged novo: o usuário é achado pelos membros atuais e ex-membros
+    directory.set_user_depts(NAMES[1], old=["TI"], new=["RH"])
+    stats = _sync(db)
+
+    assert stats["mode"] == "incremental"
+    assert stats["updated"] == 1
+    employee = _employee(db, NAMES[1])
+    assert (employee.department, employee.meta["depts"]) == ("RH", ["RH"])
+
+def test_incremental_run_deactivates_deleted_accounts(db, directory):
+    _sync(db)
+
+    directory.conn.delete(directory.user_dn(NAMES[2]))
+    stats = _sync(db)
+
+    assert (stats["mode"], stats["deactivated"]) == ("incremental", 1)
+    assert _employee(db, NAMES[2]).is_active is False
+
+def test_forced_and_new_dc_runs_are_full(db, directory):
+    _sync(db)
+
+    stats = _sync(db, full=True)
+    assert stats["mode"] == "full"
+    assert stats["unchanged"] == len(NAMES)  # Releu todo mundo
+
+    directory.server.info.other["dsServiceName"] = ["CN=NTDS Settings,CN=DC2"]
+    assert _sync(db)["mode"] == "full"  # USNs de outro DC não valem como marca
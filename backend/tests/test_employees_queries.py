@@ -0,0 +1,59 @@
+"""
+Regressão de N+1 no diretório de colaboradores: GET /employees tem que emitir o mesmo número de
+comandos SQL qualquer que seja a quantidade de colaboradores na página, mantendo a ordem (nome, id).
+
+Cada caso cria os próprios colaboradores dentro da transação do teste (ver conftest.py).
+"""
+import uuid
+import pytest
+from sqlalchemy import event
+
+from database import engine
+from models.users import User, Employee
+
+PREFIX = f"t{uuid.uuid4().hex[:6]}"
+
+def _add_employees(db, start: int, count: int) -> None:
+    for i in range(start, start + count):
+        user = User(id=uuid.uuid4(), username=f"{PREFIX}.{i:03d}", email=f"{PREFIX}.{i:03d}@example.com", role="user")
+        db.add(user)
+        db.flush()
+        db.add(Employee(id=uuid.uuid4(), user_id=user.id, full_name=f"{PREFIX} Pessoa {i:03d}", department="TI"))
+    db.flush()
+
+def _list(client, params) -> tuple:
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/employees", params=params)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert response.status_code == 200, response.text
+    # Só os colaboradores deste teste (o banco pode ter outros)
+    names = [item["full_name"] for item in response.json()["items"] if item["full_name"].startswith(PREFIX)]
+    return len(statements), names
+
+@pytest.mark.parametrize("params", [
+    {"limit": 100},
+    {"limit": 100, "search": PREFIX},
+    {"limit": 100, "status": "all"},
+])
+def test_list_employees_statement_count_is_constant(db, client, params):
+    _add_employees(db, 0, 3)
+    small, small_names = _list(client, params)
+
+    _add_employees(db, 3, 40)
+    large, large_names = _list(client, params)
+
+    assert large == small
+    assert small_names == sorted(small_names)
+    assert large_names == sorted(large_names)
+
+def test_list_employees_search_returns_own_rows_in_name_order(db, client):
+    _add_employees(db, 0, 12)
+    _, names = _list(client, {"limit": 100, "search": PREFIX})
+    assert names == [f"{PREFIX} Pessoa {i:03d}" for i in range(12)]
@@ -0,0 +1,71 @@
+"""
+Fila da sincronização com o AD (directory_sync_jobs): no máximo uma execução na fila ou rodando.
+Banco na transação do teste (ver conftest.py); o worker não é acordado.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete, update
+
+from models.sync import DirectorySyncJob
+from services import sync_jobs
+
+@pytest.fixture
+def jobs(db, session_factory, monkeypatch):
+    db.execute(delete(DirectorySyncJob))
+    db.commit()
+    monkeypatch.setattr(sync_jobs, "SessionLocal", session_factory)
+    return db
+
+def _finish(db, job, status="succeeded"):
+    db.execute(update(DirectorySyncJob).where(DirectorySyncJob.id == job.id).values(status=status))
+    db.commit()
+
+def test_enqueue_returns_active_job_instead_of_duplicating(jobs):
+    job, created = sync_jobs.enqueue(jobs, wake=False)
+    assert created and job.status == "queued"
+
+    again, created_again = sync_jobs.enqueue(jobs, full=True, trigger="manual", wake=False)
+    assert not created_again
+    assert again.id == job.id and again.full is False
+
+    _finish(jobs, job, status="running")
+    running, created_running = sync_jobs.enqueue(jobs, wake=False)
+    assert not created_running and running.id == job.id
+
+def test_enqueue_creates_new_job_after_previous_finished(jobs):
+    job, _ = sync_jobs.enqueue(jobs, wake=False)
+    _finish(jobs, job)
+
+    new_job, created = sync_jobs.enqueue(jobs, full=True, wake=False)
+    assert created and new_job.id != job.id and new_job.full is True
+
+def test_scheduled_enqueue_skips_when_a_run_started_recently(jobs, monkeypatch):
+    monkeypatch.setattr(sync_jobs, "SYNC_INTERVAL_MINUTES", 60)
+
+    sync_jobs._enqueue_if_due()
+    assert jobs.query(DirectorySyncJob).filter_by(trigger="schedule").count() == 1
+
+    [job] = jobs.query(DirectorySyncJob).all()
+    _finish(jobs, job)
+    sync_jobs._enqueue_if_due()  # A anterior é de agora há pouco: não enfileira outra
+    assert jobs.query(DirectorySyncJob).count() == 1
+
+    jobs.execute(update(DirectorySyncJob).values(created_at=datetime.utcnow() - timedelta(minutes=61)))
+    jobs.commit()
+    sync_jobs._enqueue_if_due()
+    assert jobs.query(DirectorySyncJob).count() == 2
+
+def test_claim_marks_orphaned_run_as_failed(jobs):
+    orphan, _ = sync_jobs.enqueue(jobs, wake=False)
+    _finish(jobs, orphan, status="running")  # O processo que rodava morreu no meio
+
+    assert sync_jobs._claim() is None
+    jobs.refresh(orphan)
+    assert orphan.status == "failed" and orphan.finished_at is not None
+
+    job, created = sync_jobs.enqueue(jobs, wake=False)
+    assert created
+    claimed = sync_jobs._claim()
+    assert claimed.id == job.id
+    jobs.refresh(job)
+    assert job.status == "running"
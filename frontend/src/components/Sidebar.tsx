@@ -1,10 +1,27 @@
 "use client";
 
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { LogOut, Bell, Users, LayoutDashboard, ShieldAlert } from 'lucide-react';
 import { fetchAPI } from '@/utils/api';
 
 export const Sidebar = ({ user }: { user: any }) => {
+  const [unread, setUnread] = useState(0);
+
+  // Badge de avisos não lidos: rota leve (só contagens), consultada periodicamente
+  useEffect(() => {
+    const loadUnread = async () => {
+      try {
+        const res = await fetchAPI('/announcements/unread-count');
+        if (res.ok) setUnread((await res.json())?.total ?? 0);
+      } catch (e) {
+        console.error("Erro ao carregar avisos não lidos");
+      }
+    };
+    loadUnread();
+    const timer = setInterval(loadUnread, 60000);
+    return () => clearInterval(timer);
+  }, []);
+
   const handleLogout = async () => {
     try {
       // 1. Avisa o backend para deletar o Cookie HttpOnly
@@ -20,7 +37,7 @@ export const Sidebar = ({ user }: { user: any }) => {
 
   const menu = [
     { title: 'Início', icon: <LayoutDashboard size={20} />, path: '/dashboard' },
-    { title: 'Avisos', icon: <Bell size={20} />, path: '/avisos' },
+    { title: 'Avisos', icon: <Bell size={20} />, path: '/avisos', badge: unread },
     { title: 'Pessoas', icon: <Users size={20} />, path: '/colaboradores' },
   ];
 
@@ -36,6 +53,11 @@ export const Sidebar = ({ user }: { user: any }) => {
           <a key={item.path} href={item.path} className="flex items-center gap-4 px-4 py-4 rounded-2xl text-slate-400 hover:bg-white/5 hover:text-[#D4AF37] transition-all">
             {item.icon}
             <span className="text-[11px] font-black uppercase tracking-widest">{item.title}</span>
+            {!!item.badge && (
+              <span className="ml-auto bg-[#D4AF37] text-[#002147] text-[9px] font-black rounded-full px-2 py-0.5">
+                {item.badge > 99 ? '99+' : item.badge}
+              </span>
+            )}
           </a>
         ))}
       </nav>
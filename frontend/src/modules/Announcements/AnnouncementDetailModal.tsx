@@ -2,8 +2,13 @@ import React, { useState } from 'react';
 import { X, Download, CheckCircle, Archive, History, User, Clock, Loader2, Bell, AlertCircle, RefreshCw } from 'lucide-react';
 import { fetchAPI } from '../../utils/api'; // 🔥 Importamos o seu utilitário de API!
 
-interface LogEntry { name: string; dept: string; }
-interface AnnouncementLogs { acknowledged: LogEntry[]; pending: LogEntry[]; }
+interface LogEntry { name: string; dept: string; acknowledged_at: string | null; }
+interface LogPage { items: LogEntry[]; next_offset: number | null; }
+interface LogSummary { acknowledged: number; pending: number; }
+interface AnnouncementLogs { acknowledged: LogPage; pending: LogPage; summary: LogSummary; }
+
+type LogStatus = 'acknowledged' | 'pending';
+const LOGS_PAGE_SIZE = 50;
 
 export const AnnouncementDetailModal = ({ ann, user, onClose, onRefresh }: any) => {
   const [showLogs, setShowLogs] = useState(false);
@@ -20,17 +25,27 @@ export const AnnouncementDetailModal = ({ ann, user, onClose, onRefresh }: any)
     user.permissions?.includes('post_tech')
   );
 
+  const fetchLogPage = async (status: LogStatus, offset: number): Promise<LogPage> => {
+    const res = await fetchAPI(`/announcements/${ann.id}/logs?status=${status}&limit=${LOGS_PAGE_SIZE}&offset=${offset}`);
+    if (!res.ok) throw new Error("Falha ao carregar logs");
+    return res.json();
+  };
+
   const fetchLogs = async () => {
     try {
       setLoadingLogs(true);
       setError(null);
       
-      // 🔥 Usando fetchAPI para passar pelo proxy e enviar os Cookies
-      const res = await fetchAPI(`/announcements/${ann.id}/logs`);
+      // 🔥 Totais e primeira página de cada lista em paralelo (via proxy, com Cookies)
+      const [resSummary, acknowledged, pending] = await Promise.all([
+        fetchAPI(`/announcements/${ann.id}/logs/summary`),
+        fetchLogPage('acknowledged', 0),
+        fetchLogPage('pending', 0),
+      ]);
       
-      if (res.ok) {
-        const data = await res.json();
-        setLogs(data);
+      if (resSummary.ok) {
+        const summary = await resSummary.json();
+        setLogs({ acknowledged, pending, summary });
       } else {
         setError("Não foi possível carregar os logs de auditoria.");
       }
@@ -41,6 +56,17 @@ export const AnnouncementDetailModal = ({ ann, user, onClose, onRefresh }: any)
     }
   };
 
+  const fetchMoreLogs = async (status: LogStatus) => {
+    const current = logs?.[status];
+    if (!logs || !current || current.next_offset === null) return;
+    try {
+      const page = await fetchLogPage(status, current.next_offset);
+      setLogs({ ...logs, [status]: { items: [...current.items, ...page.items], next_offset: page.next_offset } });
+    } catch (e) {
+      setError("Erro de conexão com o servidor.");
+    }
+  };
+
   const handleAcknowledge = async () => {
     try {
       setLoading(true);
@@ -210,10 +236,10 @@ export const AnnouncementDetailModal = ({ ann, user, onClose, onRefresh }: any)
                     {/* Coluna Pendentes */}
                     <div className="flex flex-col space-y-4">
                       <h4 className="font-black text-red-500 text-[10px] uppercase tracking-[0.2em] flex items-center gap-2 px-2">
-                         <Clock size={14} /> Pendentes ({logs?.pending?.length || 0})
+                         <Clock size={14} /> Pendentes ({logs?.summary?.pending || 0})
                       </h4>
                       <div className="space-y-2">
-                        {logs?.pending?.map((p, i) => (
+                        {logs?.pending?.items?.map((p, i) => (
                           <div key={i} className="bg-white p-4 rounded-2xl border border-slate-100 flex items-start gap-3 shadow-sm">
                              <div className="w-8 h-8 rounded-lg bg-slate-50 flex items-center justify-center text-slate-400 flex-shrink-0 mt-1"><User size={14} /></div>
                              <div className="min-w-0">
@@ -223,21 +249,26 @@ export const AnnouncementDetailModal = ({ ann, user, onClose, onRefresh }: any)
                              </div>
                           </div>
                         ))}
-                        {logs?.pending && logs.pending.length === 0 && (
+                        {logs?.pending && logs.pending.items.length === 0 && (
                           <div className="py-10 text-center border-2 border-dashed border-slate-100 rounded-3xl">
                             <p className="text-slate-300 text-[10px] font-black uppercase">Todos já leram!</p>
                           </div>
                         )}
+                        {logs?.pending?.next_offset != null && (
+                          <button onClick={() => fetchMoreLogs('pending')} className="w-full py-3 text-[10px] font-black uppercase tracking-widest text-slate-400 hover:text-[#002147] transition-colors">
+                            Carregar mais
+                          </button>
+                        )}
                       </div>
                     </div>
 
                     {/* Coluna Cientes */}
                     <div className="flex flex-col space-y-4">
                       <h4 className="font-black text-green-600 text-[10px] uppercase tracking-[0.2em] flex items-center gap-2 px-2">
-                         <CheckCircle size={14} /> Confirmados ({logs?.acknowledged?.length || 0})
+                         <CheckCircle size={14} /> Confirmados ({logs?.summary?.acknowledged || 0})
                       </h4>
                       <div className="space-y-2">
-                        {logs?.acknowledged?.map((p, i) => (
+                        {logs?.acknowledged?.items?.map((p, i) => (
                           <div key={i} className="bg-white p-4 rounded-2xl border border-green-100 flex items-start gap-3 shadow-sm">
                              <div className="w-8 h-8 rounded-lg bg-green-50 flex items-center justify-center text-green-500 flex-shrink-0 mt-1"><User size={14} /></div>
                              <div className="min-w-0">
@@ -247,11 +278,16 @@ export const AnnouncementDetailModal = ({ ann, user, onClose, onRefresh }: any)
                              </div>
                           </div>
                         ))}
-                        {logs?.acknowledged && logs.acknowledged.length === 0 && (
+                        {logs?.acknowledged && logs.acknowledged.items.length === 0 && (
                           <div className="py-10 text-center border-2 border-dashed border-slate-100 rounded-3xl">
                             <p className="text-slate-300 text-[10px] font-black uppercase">Ninguém confirmou ainda</p>
                           </div>
                         )}
+                        {logs?.acknowledged?.next_offset != null && (
+                          <button onClick={() => fetchMoreLogs('acknowledged')} className="w-full py-3 text-[10px] font-black uppercase tracking-widest text-slate-400 hover:text-[#002147] transition-colors">
+                            Carregar mais
+                          </button>
+                        )}
                       </div>
                     </div>
 
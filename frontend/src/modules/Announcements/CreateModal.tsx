@@ -21,12 +21,13 @@ export const CreateModal = ({ isOpen, onClose, user, onSuccess }: CreateModalPro
     content: '',
     category: '',
     target_dept: '',
+    expires_at: '',
     file: null as File | null
   });
 
   useEffect(() => {
     if (isOpen) {
-      setFormData({ title: '', content: '', category: '', target_dept: '', file: null });
+      setFormData({ title: '', content: '', category: '', target_dept: '', expires_at: '', file: null });
       fetchDepartments();
     }
   }, [isOpen]);
@@ -55,6 +56,7 @@ export const CreateModal = ({ isOpen, onClose, user, onSuccess }: CreateModalPro
       data.append('content', formData.content);
       data.append('category', formData.category);
       if (formData.target_dept) data.append('target_dept', formData.target_dept);
+      if (formData.expires_at) data.append('expires_at', formData.expires_at);
       if (formData.file) data.append('file', formData.file);
 
       // 🔥 Usando fetchAPI, SEM a barra no final, e deixando o navegador lidar com o Cookie!
@@ -136,6 +138,18 @@ export const CreateModal = ({ isOpen, onClose, user, onSuccess }: CreateModalPro
             onChange={e => setFormData({...formData, content: e.target.value})}
           />
 
+          {/* Expiração: o aviso é arquivado automaticamente depois da data */}
+          <div className="flex flex-col gap-2">
+            <label className="text-[10px] font-black text-slate-400 uppercase tracking-widest pl-1">Expira em (Opcional)</label>
+            <input
+              type="date"
+              min={new Date(Date.now() + 86400000).toISOString().slice(0, 10)}
+              className="w-full bg-slate-50 border border-slate-200 rounded-xl px-4 py-3 font-bold text-slate-700"
+              value={formData.expires_at}
+              onChange={e => setFormData({...formData, expires_at: e.target.value})}
+            />
+          </div>
+
           {/* Área de Anexo */}
           <div className="flex flex-col gap-2">
             <label className="text-[10px] font-black text-slate-400 uppercase tracking-widest pl-1">Anexo (Opcional)</label>
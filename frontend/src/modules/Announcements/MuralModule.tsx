@@ -1,7 +1,7 @@
 "use client";
 
 import React, { useState, useEffect } from 'react';
-import { Bell, Plus, Loader2, Megaphone, Paperclip, CheckCircle2, Archive as ArchiveIcon } from 'lucide-react';
+import { Bell, Plus, Loader2, Megaphone, Paperclip, CheckCircle2, Archive as ArchiveIcon, Search } from 'lucide-react';
 import { UserData } from '../../types/user';
 
 // IMPORTANTE: Certifique-se de que estes componentes existem no seu projeto
@@ -37,11 +37,29 @@ const fetchAPI = async (endpoint: string, options: RequestInit = {}) => {
   }
 };
 
+/**
+ * Renderiza os trechos destacados pela busca (<mark>...</mark>) sem usar innerHTML.
+ */
+const Highlight = ({ text }: { text: string }) => (
+  <>
+    {text.split(/(<mark>.*?<\/mark>)/g).map((part, i) =>
+      part.startsWith('<mark>')
+        ? <mark key={i} className="bg-[#D4AF37]/30 text-inherit rounded px-0.5">{part.slice(6, -7)}</mark>
+        : <React.Fragment key={i}>{part}</React.Fragment>
+    )}
+  </>
+);
+
 export const MuralModule = ({ user }: { user: UserData | null }) => {
   const [announcements, setAnnouncements] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [activeTab, setActiveTab] = useState('ALL');
   const [viewArchived, setViewArchived] = useState(false);
+  const [search, setSearch] = useState('');
+  const [query, setQuery] = useState('');
+  const [refreshTick, setRefreshTick] = useState(0);
   
   const [isCreateOpen, setIsCreateOpen] = useState(false);
   const [selectedAnn, setSelectedAnn] = useState<any | null>(null);
@@ -63,12 +81,13 @@ export const MuralModule = ({ user }: { user: UserData | null }) => {
        * Adicionamos a barra "/" ANTES do "?" para bater na rota exata do FastAPI.
        * Isso impede o Redirect 307 que vaza o nome interno "backend:8000".
        */
-      const url = `/announcements?category=${activeTab}&show_archived=${viewArchived}`;
+      const url = `/announcements?category=${activeTab}&show_archived=${viewArchived}${query ? `&q=${encodeURIComponent(query)}` : ''}`;
       const res = await fetchAPI(url);
       
       if (res.ok) {
         const data = await res.json();
-        setAnnouncements(Array.isArray(data) ? data : []);
+        setAnnouncements(Array.isArray(data?.items) ? data.items : []);
+        setNextCursor(data?.next_cursor ?? null);
       }
     } catch (e) { 
       console.error("Erro ao carregar avisos:", e); 
@@ -77,9 +96,48 @@ export const MuralModule = ({ user }: { user: UserData | null }) => {
     }
   };
 
+  // Busca a próxima página usando o cursor devolvido pela API
+  const fetchMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const url = `/announcements?category=${activeTab}&show_archived=${viewArchived}${query ? `&q=${encodeURIComponent(query)}` : ''}&cursor=${encodeURIComponent(nextCursor)}`;
+      const res = await fetchAPI(url);
+
+      if (res.ok) {
+        const data = await res.json();
+        setAnnouncements((prev) => [...prev, ...(Array.isArray(data?.items) ? data.items : [])]);
+        setNextCursor(data?.next_cursor ?? null);
+      }
+    } catch (e) {
+      console.error("Erro ao carregar mais avisos:", e);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => { 
     fetchAnnouncements(); 
-  }, [activeTab, viewArchived]);
+  }, [activeTab, viewArchived, query, refreshTick]);
+
+  // Atualizações em tempo real (SSE): recarrega a lista só quando algo muda no servidor
+  useEffect(() => {
+    const source = new EventSource('/api/announcements/events', { withCredentials: true });
+    const refresh = () => setRefreshTick((t) => t + 1);
+    ['announcement_created', 'announcement_archived', 'announcement_unarchived', 'resync']
+      .forEach((type) => source.addEventListener(type, refresh));
+    source.addEventListener('ack_count', (e) => {
+      const { id, ack_count } = JSON.parse((e as MessageEvent).data);
+      setAnnouncements((prev) => prev.map((a) => (a.id === id ? { ...a, ack_count } : a)));
+    });
+    return () => source.close();
+  }, []);
+
+  // Só busca depois que o usuário para de digitar
+  useEffect(() => {
+    const timer = setTimeout(() => setQuery(search.trim()), 400);
+    return () => clearTimeout(timer);
+  }, [search]);
 
   const categories = [
     { id: 'ALL', label: 'Todos' },
@@ -142,6 +200,17 @@ export const MuralModule = ({ user }: { user: UserData | null }) => {
             </button>
           ))}
         </div>
+
+        <div className="relative ml-auto flex-shrink-0">
+          <Search size={14} className="absolute left-3 top-1/2 -translate-y-1/2 text-slate-300" />
+          <input
+            type="text"
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            placeholder="Buscar comunicados..."
+            className="bg-white border border-slate-100 rounded-xl pl-9 pr-4 py-2.5 text-xs font-medium text-slate-600 outline-none focus:border-[#002147] transition-all w-64"
+          />
+        </div>
       </div>
 
       {/* Grid de Avisos */}
@@ -163,14 +232,23 @@ export const MuralModule = ({ user }: { user: UserData | null }) => {
                 {ann.category === 'SECTOR' ? ann.target_dept : ann.category}
               </div>
 
+              {ann.thumbnail_url && (
+                <img
+                  src={`/api${ann.thumbnail_url}`}
+                  alt={ann.attachment_name || 'Prévia do anexo'}
+                  loading="lazy"
+                  className="w-full h-32 object-cover rounded-2xl mb-4 border border-slate-50"
+                />
+              )}
+
               <div className="mb-4">
                 <h4 className="font-black text-slate-800 text-base leading-tight group-hover:text-[#002147] transition-colors line-clamp-2 pr-10">
-                  {ann.title}
+                  {ann.title_highlight ? <Highlight text={ann.title_highlight} /> : ann.title}
                 </h4>
               </div>
 
               <p className="text-xs text-slate-500 leading-relaxed line-clamp-3 mb-6 font-medium">
-                {ann.content}
+                {ann.snippet ? <Highlight text={ann.snippet} /> : ann.content}
               </p>
 
               <div className="flex items-center justify-between pt-4 border-t border-slate-50">
@@ -203,6 +281,18 @@ export const MuralModule = ({ user }: { user: UserData | null }) => {
         )}
       </div>
 
+      {!loading && nextCursor && (
+        <div className="flex justify-center">
+          <button
+            onClick={fetchMore}
+            disabled={loadingMore}
+            className="bg-white text-[#002147] border border-slate-100 px-6 py-3 rounded-xl font-black text-[10px] uppercase tracking-widest flex items-center gap-2 hover:bg-slate-50 transition-all shadow-sm"
+          >
+            {loadingMore ? <Loader2 className="animate-spin" size={14} /> : 'Carregar mais'}
+          </button>
+        </div>
+      )}
+
       <CreateModal isOpen={isCreateOpen} onClose={() => setIsCreateOpen(false)} user={user} onSuccess={fetchAnnouncements} />
       
       {selectedAnn && (
@@ -36,8 +36,10 @@ const fetchAPI = async (endpoint: string, options: RequestInit = {}) => {
 };
 
 export default function EmployeeList({ onOpenQuickView }: { onOpenQuickView: (emp: any) => void }) {
-  const [employees, setEmployees] = useState([]);
+  const [employees, setEmployees] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [search, setSearch] = useState('');
   const [status, setStatus] = useState('active');
 
@@ -49,9 +51,11 @@ export default function EmployeeList({ onOpenQuickView }: { onOpenQuickView: (em
        * Adicionamos a barra "/" após 'employees' e ANTES do "?".
        * Isso impede o FastAPI de dar o redirect 307 que quebra o navegador.
        */
-      const res = await fetchAPI(`/employees/?search=${search}&status=${status}`);
+      const res = await fetchAPI(`/employees/?search=${encodeURIComponent(search)}&status=${status}`);
       if (res.ok) {
-        setEmployees(await res.json());
+        const data = await res.json();
+        setEmployees(Array.isArray(data?.items) ? data.items : []);
+        setNextCursor(data?.next_cursor ?? null);
       }
     } catch (e) {
       console.error("❌ Falha na conexão com o Proxy.");
@@ -60,6 +64,24 @@ export default function EmployeeList({ onOpenQuickView }: { onOpenQuickView: (em
     }
   };
 
+  // Próxima página pelo cursor devolvido pela API
+  const fetchMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const res = await fetchAPI(`/employees/?search=${encodeURIComponent(search)}&status=${status}&cursor=${encodeURIComponent(nextCursor)}`);
+      if (res.ok) {
+        const data = await res.json();
+        setEmployees((prev) => [...prev, ...(Array.isArray(data?.items) ? data.items : [])]);
+        setNextCursor(data?.next_cursor ?? null);
+      }
+    } catch (e) {
+      console.error("❌ Falha ao carregar mais colaboradores.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => { 
     const delay = setTimeout(fetchEmployees, 300);
     return () => clearTimeout(delay);
@@ -114,6 +136,18 @@ export default function EmployeeList({ onOpenQuickView }: { onOpenQuickView: (em
             )}
           </tbody>
         </table>
+
+        {!loading && nextCursor && (
+          <div className="flex justify-center py-6 border-t border-slate-50">
+            <button
+              onClick={fetchMore}
+              disabled={loadingMore}
+              className="px-6 py-3 rounded-xl font-black text-[10px] uppercase tracking-widest text-[#002147] border border-slate-100 hover:bg-slate-50 transition-all"
+            >
+              {loadingMore ? <Loader2 className="animate-spin" size={14} /> : 'Carregar mais'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );